@@ -0,0 +1,16 @@
+"""Analytics page entrypoint."""
+
+from __future__ import annotations
+
+from services.auth_guard import ensure_authenticated
+from ui.analytics_ui import main as analytics_main
+
+
+def main() -> None:
+    if not ensure_authenticated("analytics"):
+        return
+    analytics_main(set_page_config=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ ROUTE_TO_LABEL = {
     "audit": "Auditoria",
     "users": "Cadastro de Usuarios",
     "admin": "SQL Admin",
+    "analytics": "Analytics",
 }
 LABEL_TO_ROUTE = {label: route for route, label in ROUTE_TO_LABEL.items()}
 
@@ -94,6 +95,7 @@ def main() -> None:
     if role == "ADMIN":
         options.append("Cadastro de Usuarios")
         options.append("SQL Admin")
+        options.append("Analytics")
 
     initial_page = _resolve_initial_page(options)
     page_label = st.sidebar.radio("Ir para", options, index=options.index(initial_page))
@@ -107,6 +109,9 @@ def main() -> None:
     elif route_key == "users":
         user_registration_ui = importlib.import_module("ui.user_registration_ui")
         user_registration_ui.main(set_page_config=False)
+    elif route_key == "analytics":
+        analytics_ui = importlib.import_module("ui.analytics_ui")
+        analytics_ui.main(set_page_config=False)
     elif route_key == "audit":
         compliance_ui = importlib.import_module("ui.compliance_ui")
         compliance_ui.main(set_page_config=False)
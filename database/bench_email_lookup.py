@@ -0,0 +1,113 @@
+"""
+Benchmark da busca de usuario por email (login) num banco temporario.
+
+Aplica as migracoes num arquivo temporario, insere N usuarios e mede
+a consulta usada pelo login (email = ? COLLATE NOCASE) contra a antiga
+(lower(email) = ?). O tempo da consulta indexada deve ficar praticamente
+constante entre 10k e 1M usuarios (O(log n)); a antiga cresce linearmente.
+
+Uso: python database/bench_email_lookup.py --sizes 10000 100000 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from database.migrate import migrate
+from services.auth_service import USER_BY_EMAIL_SQL
+
+LEGACY_SQL = "SELECT * FROM users WHERE lower(email) = ?"
+INSERT_BATCH = 50_000
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark email lookups on the users table.")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+        help="Quantidades de usuarios a testar.",
+    )
+    parser.add_argument("--lookups", type=int, default=2000, help="Buscas indexadas por tamanho.")
+    parser.add_argument(
+        "--legacy-lookups",
+        type=int,
+        default=20,
+        help="Buscas com lower(email) por tamanho (0 para pular).",
+    )
+    return parser.parse_args()
+
+
+def _email(i: int) -> str:
+    return f"Usuario.{i}@Empresa.com"
+
+
+def _populate(conn: sqlite3.Connection, start: int, end: int) -> None:
+    for batch_start in range(start, end, INSERT_BATCH):
+        batch_end = min(end, batch_start + INSERT_BATCH)
+        conn.executemany(
+            "INSERT INTO users (usuario, email, password, nivel, setor) VALUES (?, ?, 'x', 1, ?)",
+            ((f"usuario {i}", _email(i), f"setor {i % 50}") for i in range(batch_start, batch_end)),
+        )
+    conn.commit()
+
+
+def _plan(conn: sqlite3.Connection, sql: str) -> str:
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", ("x",)).fetchall()
+    return "; ".join(row[3] for row in rows)
+
+
+def _time_lookups(conn: sqlite3.Connection, sql: str, size: int, lookups: int) -> float:
+    """Media em microssegundos por busca (emails em minusculas, como o login normaliza)."""
+    emails = [_email(random.randrange(size)).lower() for _ in range(lookups)]
+    start = time.perf_counter()
+    for email in emails:
+        if conn.execute(sql, (email,)).fetchone() is None:
+            raise RuntimeError(f"usuario nao encontrado: {email}")
+    return (time.perf_counter() - start) / lookups * 1_000_000
+
+
+def main() -> int:
+    args = parse_args()
+    sizes = sorted(set(args.sizes))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        conn = sqlite3.connect(Path(tmp_dir) / "bench_users.db")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = OFF")
+        migrate(conn)
+
+        print(f"login:   {_plan(conn, USER_BY_EMAIL_SQL)}")
+        print(f"legado:  {_plan(conn, LEGACY_SQL)}")
+        print(f"{'usuarios':>10} {'login (us)':>12} {'legado (us)':>12}")
+
+        populated = 0
+        for size in sizes:
+            _populate(conn, populated, size)
+            populated = size
+            conn.execute("ANALYZE")
+            indexed = _time_lookups(conn, USER_BY_EMAIL_SQL, size, args.lookups)
+            legacy = (
+                f"{_time_lookups(conn, LEGACY_SQL, size, args.legacy_lookups):12.1f}"
+                if args.legacy_lookups > 0
+                else f"{'-':>12}"
+            )
+            print(f"{size:>10} {indexed:12.1f} {legacy}")
+
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
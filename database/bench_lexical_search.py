@@ -0,0 +1,132 @@
+"""
+Benchmark da busca lexical (BM25 / FTS5) do modo hibrido num indice temporario.
+
+Gera N chunks sinteticos (~1000 caracteres, vocabulario com distribuicao de
+Zipf, como texto real) com identificadores de contrato e CPF, indexa pelo
+LexicalIndex e mede LexicalIndex.search para quatro formatos de pergunta:
+identificador exato (junto de palavras comuns), termos raros, termos de
+frequencia media e termos muito comuns. A meta e ficar abaixo de 10 ms por
+busca com 1M chunks. Termos em mais de LEXICAL_MAX_MATCHES chunks ficam so
+com a busca vetorial, entao "medio" e "comum" podem nao ter resultado lexical.
+
+Uso: python database/bench_lexical_search.py --sizes 100000 1000000
+     (--db caminho.db reaproveita um indice ja gerado entre execucoes)
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from database.vector_store import LexicalIndex
+
+COLLECTION = "bench_docs"
+VOCABULARY_SIZE = 50_000
+WORDS_PER_CHUNK = 150
+INSERT_BATCH = 5_000
+SYLLABLES = "ba be bi bo bu ca ce ci co cu da de di do du fa fe fi fo fu ga ge gi go gu la le li lo lu ma me mi mo mu na ne ni no nu pa pe pi po pu ra re ri ro ru sa se si so su ta te ti to tu va ve vi vo vu".split()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark lexical (BM25) searches on the FTS index.")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[100_000, 1_000_000],
+        help="Quantidades de chunks a testar.",
+    )
+    parser.add_argument("--queries", type=int, default=200, help="Buscas por formato e tamanho.")
+    parser.add_argument("--limit", type=int, default=30, help="Chunks retornados por busca.")
+    parser.add_argument("--db", type=Path, help="Arquivo do indice (mantido entre execucoes).")
+    return parser.parse_args()
+
+
+def _vocabulary(rng: random.Random) -> list[str]:
+    words: dict[str, None] = {}
+    while len(words) < VOCABULARY_SIZE:
+        words["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))] = None
+    return list(words)
+
+
+def _chunk(rng: random.Random, vocabulary: list[str], weights: list[float], i: int) -> str:
+    words = rng.choices(vocabulary, cum_weights=weights, k=WORDS_PER_CHUNK)
+    words.insert(rng.randrange(len(words)), f"contrato CTR-{2000 + i % 25}/{i}")
+    words.insert(rng.randrange(len(words)), f"cpf {i % 1000:03d}.{i // 1000 % 1000:03d}.{i % 997:03d}-{i % 97:02d}")
+    return " ".join(words)
+
+
+def _populate(index: LexicalIndex, start: int, end: int, vocabulary: list[str], weights: list[float]) -> None:
+    rng = random.Random(start)
+    for batch_start in range(start, end, INSERT_BATCH):
+        batch_end = min(end, batch_start + INSERT_BATCH)
+        ids = [f"chunk-{i}" for i in range(batch_start, batch_end)]
+        texts = [_chunk(rng, vocabulary, weights, i) for i in range(batch_start, batch_end)]
+        index.add(COLLECTION, ids, texts)
+
+
+def _indexed_count(index: LexicalIndex) -> int:
+    table = index._table(COLLECTION)
+    with index._lock:
+        row = index._connect().execute(f"SELECT MAX(rowid) FROM {table}_ids").fetchone()
+    return row[0] or 0
+
+
+def _time_searches(index: LexicalIndex, queries: list[str], limit: int) -> tuple[float, float, float]:
+    """Mediana e p95 em milissegundos e % de buscas com algum resultado."""
+    timings = []
+    found = 0
+    for query in queries:
+        start = time.perf_counter()
+        found += bool(index.search(COLLECTION, query, limit))
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1], found / len(queries) * 100
+
+
+def main() -> int:
+    args = parse_args()
+    sizes = sorted(set(args.sizes))
+    rng = random.Random(42)
+    vocabulary = _vocabulary(rng)
+    weights: list[float] = []
+    total = 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1.0 / rank ** 1.07
+        weights.append(total)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = LexicalIndex(args.db or Path(tmp_dir) / "bench_lexical.db")
+        index.ensure(COLLECTION, lambda: iter(()))
+        print(f"{'chunks':>10} {'formato':>10} {'mediana (ms)':>13} {'p95 (ms)':>10} {'com resultado':>14}")
+
+        for size in sizes:
+            populated = _indexed_count(index)
+            if populated < size:
+                _populate(index, populated, size, vocabulary, weights)
+
+            shapes = {
+                "id": [f"status do contrato CTR-{2000 + i % 25}/{i}" for i in (rng.randrange(size) for _ in range(args.queries))],
+                "raro": [" ".join(rng.sample(vocabulary[5000:], 3)) for _ in range(args.queries)],
+                "medio": [" ".join(rng.sample(vocabulary[500:5000], 3)) for _ in range(args.queries)],
+                "comum": [" ".join(rng.sample(vocabulary[:50], 3)) for _ in range(args.queries)],
+            }
+            for shape, queries in shapes.items():
+                median, p95, found = _time_searches(index, queries, args.limit)
+                print(f"{size:>10} {shape:>10} {median:13.2f} {p95:10.2f} {found:13.0f}%")
+
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
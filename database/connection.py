@@ -1,4 +1,7 @@
+import atexit
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
 # caminho da pasta onde ESTE arquivo está
@@ -6,15 +9,146 @@ BASE_DIR = Path(__file__).resolve().parent
 # nome do banco de dados
 DB_PATH = BASE_DIR / "db_users.db"
 
+# ajustes do SQLite aplicados em cada conexão nova
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KIB = 20000  # ~20 MB de cache de páginas por conexão
+MMAP_SIZE_BYTES = 256 * 1024 * 1024
+STATEMENT_CACHE_SIZE = 256
+# conexões ociosas mantidas para reuso; as excedentes são fechadas de fato
+POOL_MAX_IDLE = 8
+
+_idle: list["PooledConnection"] = []
+_pool_lock = threading.Lock()
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Conexão que volta para o pool em close() em vez de ser fechada.
+    Transação não confirmada é desfeita ao devolver, como aconteceria ao
+    fechar uma conexão comum. O bloco with mantém o comportamento padrão do
+    sqlite3 (só commit/rollback); para devolver ao sair use pooled_connection().
+
+    Cada empréstimo pertence à thread que chamou get_connection(): usar a
+    conexão depois de devolvê-la, ou a partir de outra thread, levanta
+    ProgrammingError (o papel de check_same_thread, desligado por causa do pool).
+    """
+
+    _in_pool = False
+    _owner = None
+
+    def _check_lease(self):
+        if self._in_pool or self._owner != threading.get_ident():
+            raise sqlite3.ProgrammingError("Conexão já devolvida ao pool ou emprestada a outra thread.")
+
+    def cursor(self, *args, **kwargs):
+        self._check_lease()
+        return super().cursor(*args, **kwargs)
+
+    def execute(self, *args, **kwargs):
+        self._check_lease()
+        return super().execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._check_lease()
+        return super().executemany(*args, **kwargs)
+
+    def executescript(self, *args, **kwargs):
+        self._check_lease()
+        return super().executescript(*args, **kwargs)
+
+    def commit(self):
+        self._check_lease()
+        super().commit()
+
+    def rollback(self):
+        self._check_lease()
+        super().rollback()
+
+    def close(self):
+        if self._in_pool and self._owner == threading.get_ident():
+            return  # close() repetido pelo mesmo dono
+        self._check_lease()
+        if self.in_transaction:
+            self.rollback()
+        _release(self)
+
+    def close_for_real(self):
+        super().close()
+
+
+def _open() -> PooledConnection:
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,  # a conexão muda de thread entre usos, nunca é compartilhada
+        cached_statements=STATEMENT_CACHE_SIZE,
+        factory=PooledConnection,
+    )
+    conn._owner = threading.get_ident()
+    # WAL: leitores não bloqueiam o escritor, e gravações concorrentes esperam em vez de falhar
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE_BYTES}")
+    return conn
+
+
+def _release(conn: PooledConnection) -> None:
+    with _pool_lock:
+        if len(_idle) < POOL_MAX_IDLE:
+            conn._in_pool = True
+            _idle.append(conn)
+            return
+    conn.close_for_real()
+
+
+def close_all() -> None:
+    """Fecha as conexões ociosas do pool (ao encerrar o processo, o WAL é consolidado)."""
+    with _pool_lock:
+        idle = list(_idle)
+        _idle.clear()
+    for conn in idle:
+        conn.close_for_real()
+
+
+atexit.register(close_all)
+
+
 def get_connection():
     """
-    Cria e retorna uma conexão com o banco de dados SQLite
+    Retorna uma conexão com o banco de dados SQLite
     localizado na mesma pasta deste arquivo.
+
+    As conexões vêm de um pool: cada uma é usada por uma única thread por
+    vez e, ao ser fechada, fica disponível para a próxima chamada.
     """
-    try: 
-        conn = sqlite3.connect(DB_PATH)
+    try:
+        with _pool_lock:
+            conn = _idle.pop() if _idle else None
+        if conn is None:
+            conn = _open()
+        conn._in_pool = False
+        conn._owner = threading.get_ident()
+        # quem usou antes pode ter mudado estes ajustes
         conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
         return conn
     except sqlite3.Error as e:
         print(f"Erro ao conectar ao banco de dados: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+@contextmanager
+def pooled_connection():
+    """
+    Conexão do pool para um bloco with: commit ao sair sem erro, rollback
+    com erro e, em ambos os casos, devolução ao pool.
+    """
+    conn = get_connection()
+    if conn is None:
+        raise sqlite3.OperationalError("Falha ao conectar ao banco de dados.")
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
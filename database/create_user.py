@@ -47,7 +47,7 @@ def main() -> int:
 
     try:
         existing = conn.execute(
-            "SELECT 1 FROM users WHERE email = ?",
+            "SELECT 1 FROM users WHERE email = ? COLLATE NOCASE",
             (args.email,),
         ).fetchone()
         if existing:
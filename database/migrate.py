@@ -0,0 +1,151 @@
+"""
+Runner de migracoes versionadas do SQLite.
+
+As migracoes ficam em database/migrations/NNNN_descricao.py e sao aplicadas
+em ordem, cada uma na sua transacao, registrando a versao em schema_version.
+BEGIN IMMEDIATE serializa processos que migram ao mesmo tempo: quem chega
+depois rele a versao e pula o que ja foi aplicado.
+
+Uso: python database/migrate.py [--status] [--target N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import pkgutil
+import re
+import sqlite3
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from database import migrations
+from database.connection import get_connection
+from utils.debug import log, time_block
+
+_MIGRATION_RE = re.compile(r"^(\d{4})_(\w+)$")
+
+
+@dataclass(frozen=True, slots=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable
+
+
+@lru_cache(maxsize=1)
+def load_migrations() -> tuple[Migration, ...]:
+    """Migracoes do pacote database.migrations, em ordem de versao."""
+    found = []
+    for module_info in pkgutil.iter_modules(migrations.__path__):
+        match = _MIGRATION_RE.match(module_info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{migrations.__name__}.{module_info.name}")
+        found.append(Migration(int(match.group(1)), match.group(2), module.upgrade))
+    found.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in found]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Versoes de migracao duplicadas: {versions}")
+    return tuple(found)
+
+
+def latest_version() -> int:
+    loaded = load_migrations()
+    return loaded[-1].version if loaded else 0
+
+
+def _ensure_version_table(conn) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at DATETIME NOT NULL DEFAULT (CURRENT_TIMESTAMP)
+        )
+        """
+    )
+    conn.commit()
+
+
+def current_version(conn) -> int:
+    """Maior versao aplicada (0 se schema_version ainda nao existe)."""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+
+def migrate(conn, target: Optional[int] = None) -> list[Migration]:
+    """Aplica as migracoes pendentes ate target (padrao: a mais recente)."""
+    _ensure_version_table(conn)
+    target = latest_version() if target is None else target
+    applied = []
+    for migration in load_migrations():
+        if migration.version > target:
+            break
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if migration.version <= current_version(conn):
+                conn.rollback()
+                continue
+            with time_block(f"migrate: {migration.version:04d}_{migration.name}"):
+                migration.upgrade(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                (migration.version, migration.name),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(migration)
+        log(f"migrate: applied {migration.version:04d}_{migration.name}")
+    return applied
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Apply pending database migrations.")
+    parser.add_argument("--status", action="store_true", help="Mostra a versao atual e as pendentes.")
+    parser.add_argument("--target", type=int, help="Migra ate esta versao (padrao: a mais recente).")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    conn = get_connection()
+    if conn is None:
+        print("Erro: falha ao conectar no banco.")
+        return 1
+
+    try:
+        version = current_version(conn)
+        if args.status:
+            print(f"Versao atual: {version} (mais recente: {latest_version()})")
+            for migration in load_migrations():
+                state = "aplicada" if migration.version <= version else "pendente"
+                print(f"  {migration.version:04d}_{migration.name}: {state}")
+            return 0
+
+        applied = migrate(conn, args.target)
+        for migration in applied:
+            print(f"Aplicada {migration.version:04d}_{migration.name}")
+        print(f"Schema na versao {current_version(conn)}.")
+        return 0
+    except Exception as exc:
+        print(f"Erro ao migrar: {exc}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
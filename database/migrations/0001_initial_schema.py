@@ -0,0 +1,94 @@
+"""Tabelas iniciais: usuarios, logs, auditoria e jobs de ingestao.
+
+Usa IF NOT EXISTS para adotar bancos criados antes do versionamento.
+"""
+
+from __future__ import annotations
+
+
+def upgrade(conn) -> None:
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL COLLATE NOCASE,
+            password TEXT NOT NULL,
+            nivel INTEGER NOT NULL DEFAULT 1,
+            setor TEXT NOT NULL,
+            created_at DATETIME NOT NULL DEFAULT (CURRENT_TIMESTAMP),
+            updated_at DATETIME NOT NULL DEFAULT (CURRENT_TIMESTAMP)
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            action TEXT NOT NULL,
+            message TEXT NOT NULL,
+            details TEXT,
+            created_at DATETIME NOT NULL DEFAULT (CURRENT_TIMESTAMP)
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_audit_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id_admin INTEGER,
+            user_id_target INTEGER,
+            action TEXT NOT NULL,
+            details TEXT,
+            created_at DATETIME NOT NULL DEFAULT (CURRENT_TIMESTAMP),
+            FOREIGN KEY(user_id_admin) REFERENCES users(id),
+            FOREIGN KEY(user_id_target) REFERENCES users(id)
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_user_audit_logs_created_at
+        ON user_audit_logs(created_at DESC)
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ingestion_jobs (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER,
+            filename TEXT NOT NULL,
+            collection_name TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            progress REAL NOT NULL DEFAULT 0,
+            message TEXT,
+            error TEXT,
+            owner TEXT,
+            created_at DATETIME NOT NULL DEFAULT (CURRENT_TIMESTAMP),
+            updated_at DATETIME NOT NULL DEFAULT (CURRENT_TIMESTAMP)
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_user_created_at
+        ON ingestion_jobs(user_id, created_at DESC)
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status ON ingestion_jobs(status)"
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_users_set_updated_at
+        AFTER UPDATE ON users
+        FOR EACH ROW
+        BEGIN
+            UPDATE users
+            SET updated_at = CURRENT_TIMESTAMP
+            WHERE id = NEW.id;
+        END;
+        """
+    )
@@ -0,0 +1,84 @@
+"""Uso do LLM por resposta (llm_usage) e agregados diarios por setor, usuario e agente."""
+
+from __future__ import annotations
+
+
+def upgrade(conn) -> None:
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS llm_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at DATETIME NOT NULL DEFAULT (CURRENT_TIMESTAMP),
+            user_id INTEGER,
+            usuario TEXT,
+            setor TEXT,
+            agent_id TEXT,
+            collection_name TEXT,
+            model TEXT,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            total_tokens INTEGER NOT NULL DEFAULT 0,
+            latency_ms REAL NOT NULL DEFAULT 0,
+            cached INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'ok'
+        )
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_llm_usage_created_at ON llm_usage(created_at)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_llm_usage_setor_created_at ON llm_usage(setor, created_at)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_llm_usage_user_created_at ON llm_usage(user_id, created_at)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_llm_usage_agent_created_at ON llm_usage(agent_id, created_at)"
+    )
+    # agregados diarios de llm_usage, atualizados a cada gravacao (services/usage_service.py)
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usage_daily_setor (
+            day TEXT NOT NULL,
+            setor TEXT NOT NULL,
+            requests INTEGER NOT NULL DEFAULT 0,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            total_tokens INTEGER NOT NULL DEFAULT 0,
+            latency_ms_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, setor)
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usage_daily_user (
+            day TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            usuario TEXT,
+            setor TEXT NOT NULL,
+            requests INTEGER NOT NULL DEFAULT 0,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            total_tokens INTEGER NOT NULL DEFAULT 0,
+            latency_ms_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, user_id)
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usage_daily_agent (
+            day TEXT NOT NULL,
+            agent_id TEXT NOT NULL,
+            requests INTEGER NOT NULL DEFAULT 0,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            total_tokens INTEGER NOT NULL DEFAULT 0,
+            latency_ms_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, agent_id)
+        )
+        """
+    )
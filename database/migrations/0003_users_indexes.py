@@ -0,0 +1,41 @@
+"""Indices de users: setor (ranking por setor) e email sem diferenciar caixa.
+
+Bancos antigos podem ter users.email sem COLLATE NOCASE; nesse caso o indice
+unico nao atende "email = ? COLLATE NOCASE" e o login varre a tabela.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+from utils.debug import log
+
+
+def _has_nocase_email_index(conn) -> bool:
+    indexes = conn.execute("PRAGMA index_list(users)").fetchall()
+    for _, index_name, unique, *_ in indexes:
+        if not unique:
+            continue
+        columns = conn.execute(
+            "SELECT name, coll FROM pragma_index_xinfo(?) WHERE key = 1",
+            (index_name,),
+        ).fetchall()
+        if len(columns) == 1 and columns[0][0] == "email" and columns[0][1].upper() == "NOCASE":
+            return True
+    return False
+
+
+def upgrade(conn) -> None:
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_setor ON users(setor)")
+    if _has_nocase_email_index(conn):
+        return
+    try:
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email_nocase ON users(email COLLATE NOCASE)"
+        )
+    except sqlite3.IntegrityError:
+        # emails repetidos com caixa diferente: mantem a busca indexada sem exigir unicidade
+        log("migrations: duplicated emails ignoring case, creating non-unique email index")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_users_email_nocase ON users(email COLLATE NOCASE)"
+        )
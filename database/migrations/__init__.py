@@ -0,0 +1,5 @@
+"""Migracoes do schema SQLite, aplicadas em ordem por database/migrate.py.
+
+Cada arquivo NNNN_descricao.py define upgrade(conn). O runner abre a
+transacao e grava a versao em schema_version; upgrade nao deve dar commit.
+"""
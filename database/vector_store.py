@@ -1,50 +1,603 @@
 from __future__ import annotations
 
 import atexit
+import hashlib
 import os
+import re
 import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Mapping, Sequence
+from typing import Any, Iterable, Mapping, Sequence
 
 import chromadb
+import numpy as np
 import streamlit as st
+from cachetools import TTLCache
 from chromadb.config import Settings
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 
-from utils.debug import log
+from utils.debug import incr, log
 
 DEFAULT_COLLECTION_NAME = "corporate_docs"
 DEFAULT_EMBEDDING_MODEL = os.getenv(
     "EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2"
 )
 PERSIST_DIRECTORY = Path(os.getenv("CHROMA_PERSIST_DIR", "chroma_db"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "1"))
+EMBEDDING_POOL_MIN_TEXTS = int(os.getenv("EMBEDDING_POOL_MIN_TEXTS", "256"))
+CHROMA_WRITE_BATCH_SIZE = int(os.getenv("CHROMA_WRITE_BATCH_SIZE", "512"))
+# junto dos dados do Chroma: clear_database apaga tudo de uma vez
+EMBEDDING_CACHE_PATH = Path(
+    os.getenv("EMBEDDING_CACHE_PATH", str(PERSIST_DIRECTORY / "embedding_cache.db"))
+)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024"))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "600"))
+FEDERATED_SEARCH_WORKERS = int(os.getenv("FEDERATED_SEARCH_WORKERS", "4"))
+# constante usual da reciprocal-rank fusion; suaviza o peso das primeiras posicoes
+RRF_K = 60
+# "hybrid" funde BM25 (indice lexical local) e busca vetorial; "vector" usa so a vetorial
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").strip().lower()
+# termos em mais chunks que isso ficam so com a busca vetorial: o BM25 pontua a
+# lista inteira de ocorrencias e o custo cresce com ela, nao com o top-k
+LEXICAL_MAX_MATCHES = int(os.getenv("LEXICAL_MAX_MATCHES", "1000"))
+_SQLITE_MAX_PARAMS = 900
 os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
 
+_query_cache_lock = threading.Lock()
+_query_embedding_cache: TTLCache = TTLCache(
+    maxsize=max(1, QUERY_CACHE_MAX_ENTRIES), ttl=QUERY_CACHE_TTL_SECONDS
+)
+_retrieval_cache: TTLCache = TTLCache(
+    maxsize=max(1, QUERY_CACHE_MAX_ENTRIES), ttl=QUERY_CACHE_TTL_SECONDS
+)
+_search_executor: ThreadPoolExecutor | None = None
+_search_executor_lock = threading.Lock()
+
+
+def _normalize_query(query: str | None) -> str:
+    return " ".join((query or "").split())
+
+
+def _cache_get(cache: TTLCache, key: tuple, counter: str):
+    if QUERY_CACHE_MAX_ENTRIES <= 0:
+        return None
+    with _query_cache_lock:
+        value = cache.get(key)
+    incr(f"{counter}.{'miss' if value is None else 'hit'}")
+    return value
+
+
+def _cache_put(cache: TTLCache, key: tuple, value) -> None:
+    if QUERY_CACHE_MAX_ENTRIES <= 0:
+        return
+    with _query_cache_lock:
+        cache[key] = value
+
+
+def _clear_query_caches() -> None:
+    with _query_cache_lock:
+        _query_embedding_cache.clear()
+        _retrieval_cache.clear()
+
+
+def _content_digest(text: str) -> str:
+    """Return the sha256 of the whitespace-normalized text."""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent (model, content digest) -> float32 vector cache with LRU eviction."""
+
+    def __init__(self, path: Path, max_entries: int):
+        self.path = Path(path)
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    model TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, digest)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used
+                ON embedding_cache(last_used)
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, model: str, digests: Sequence[str]) -> dict[str, np.ndarray]:
+        """Return cached vectors for the given digests and refresh their recency."""
+        unique = list(dict.fromkeys(digests))
+        found: dict[str, np.ndarray] = {}
+        if not unique:
+            return found
+
+        with self._lock:
+            conn = self._connect()
+            for start, end in _iter_batches(len(unique), _SQLITE_MAX_PARAMS):
+                part = unique[start:end]
+                placeholders = ", ".join("?" for _ in part)
+                rows = conn.execute(
+                    "SELECT digest, vector FROM embedding_cache "
+                    f"WHERE model = ? AND digest IN ({placeholders})",
+                    (model, *part),
+                ).fetchall()
+                for digest, blob in rows:
+                    found[digest] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embedding_cache SET last_used = ? WHERE model = ? AND digest = ?",
+                    [(now, model, digest) for digest in found],
+                )
+                conn.commit()
+        return found
+
+    def put_many(self, model: str, vectors: Mapping[str, np.ndarray]) -> None:
+        """Store vectors and evict the least recently used entries over the limit."""
+        if not vectors:
+            return
+
+        now = time.time()
+        rows = [
+            (model, digest, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for digest, vector in vectors.items()
+        ]
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO embedding_cache (model, digest, vector, last_used)
+                VALUES (?, ?, ?, ?)
+                """,
+                rows,
+            )
+            total = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+            excess = total - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    """
+                    DELETE FROM embedding_cache
+                    WHERE (model, digest) IN (
+                        SELECT model, digest FROM embedding_cache
+                        ORDER BY last_used
+                        LIMIT ?
+                    )
+                    """,
+                    (excess,),
+                )
+                log(f"vector_store: evicted {excess} cached embeddings")
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
+
+
+class CollectionVersions:
+    """Persistent per-collection token that changes on every content write.
+
+    Tokens are random, so a collection recreated after ``clear_database``
+    never reuses a token from before the wipe. An unwritten collection has
+    the empty token.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS collection_versions (
+                    collection TEXT PRIMARY KEY,
+                    version TEXT NOT NULL
+                )
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, collection_name: str) -> str:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT version FROM collection_versions WHERE collection = ?",
+                (collection_name,),
+            ).fetchone()
+        return row[0] if row else ""
+
+    def bump(self, collection_name: str) -> str:
+        token = uuid.uuid4().hex
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                """
+                INSERT INTO collection_versions (collection, version) VALUES (?, ?)
+                ON CONFLICT(collection) DO UPDATE SET version = excluded.version
+                """,
+                (collection_name, token),
+            )
+            conn.commit()
+        return token
+
+    def close(self) -> None:
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
+
+
+_collection_versions = CollectionVersions(PERSIST_DIRECTORY / "collection_versions.db")
+
+
+# stopwords frequentes em portugues: listas de postings enormes e nenhum valor lexical
+_LEXICAL_STOPWORDS = frozenset(
+    "a ao aos as com da das de do dos e em na nas no nos o os ou para por que se um uma".split()
+)
+_LEXICAL_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts_phrases(query: str) -> list[str]:
+    """Build FTS5 quoted phrases (to be OR-ed) from free text.
+
+    Each whitespace-separated term becomes one phrase, so identifiers such as
+    ``123.456.789-00`` or ``CTR-2024/17`` must match their tokens in sequence.
+    """
+    phrases = []
+    for term in query.split():
+        tokens = _LEXICAL_TERM_RE.findall(term.casefold())
+        if len(tokens) == 1 and (tokens[0] in _LEXICAL_STOPWORDS or len(tokens[0]) < 2):
+            continue
+        if tokens:
+            phrases.append('"' + " ".join(tokens) + '"')
+    return list(dict.fromkeys(phrases))
+
+
+class LexicalIndex:
+    """Per-collection SQLite FTS5 index of chunk texts, ranked with BM25.
+
+    Each collection gets its own FTS table plus a rowid -> chunk id map, so
+    deletes by chunk id stay indexed. Collections written before the index
+    existed are backfilled from Chroma: at ingest time, or in a background
+    thread when a search finds the collection unregistered (that search
+    stays vector-only). The backfill takes the lock per batch, so searches
+    on other collections are never held behind it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._ready: set[str] = set()
+        self._building: set[str] = set()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS lexical_collections (
+                    collection TEXT PRIMARY KEY
+                )
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _table(collection_name: str) -> str:
+        return "lex_" + hashlib.sha1(collection_name.encode("utf-8")).hexdigest()[:16]
+
+    def is_ready(self, collection_name: str) -> bool:
+        """True once the collection is fully indexed (backfill finished)."""
+        if collection_name in self._ready:
+            return True
+        with self._lock:
+            registered = self._connect().execute(
+                "SELECT 1 FROM lexical_collections WHERE collection = ?", (collection_name,)
+            ).fetchone()
+            if registered:
+                self._ready.add(collection_name)
+        return bool(registered)
+
+    def ensure(self, collection_name: str, load_documents) -> None:
+        """Create the collection's tables and backfill them once.
+
+        ``load_documents`` is called only for unregistered collections and
+        must yield (ids, texts) batches of everything already stored. If
+        another thread is already backfilling, this only makes sure the
+        tables exist, so ``add`` can run alongside the backfill.
+        """
+        if self.is_ready(collection_name):
+            return
+        table = self._table(collection_name)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table}_ids "
+                "(rowid INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL UNIQUE)"
+            )
+            conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+                "content, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            conn.commit()
+            if collection_name in self._building:
+                return
+            self._building.add(collection_name)
+        try:
+            for ids, texts in load_documents():
+                with self._lock:
+                    conn = self._connect()
+                    self._insert(conn, table, ids, texts)
+                    conn.commit()
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR IGNORE INTO lexical_collections (collection) VALUES (?)",
+                    (collection_name,),
+                )
+                conn.commit()
+                self._ready.add(collection_name)
+        finally:
+            with self._lock:
+                self._building.discard(collection_name)
+
+    def ensure_in_background(self, collection_name: str, load_documents) -> None:
+        """Start ``ensure`` in a daemon thread unless a backfill is running."""
+        if collection_name in self._building:
+            return
+
+        def _run() -> None:
+            try:
+                self.ensure(collection_name, load_documents)
+                log(f"vector_store: lexical index ready for '{collection_name}'")
+            except Exception as exc:
+                log(f"vector_store: lexical backfill failed for '{collection_name}': {exc}")
+
+        threading.Thread(target=_run, name="lexical-backfill", daemon=True).start()
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, table: str, ids: Sequence[str], texts: Sequence[str]) -> None:
+        for chunk_id, text in zip(ids, texts):
+            cursor = conn.execute(
+                f"INSERT OR IGNORE INTO {table}_ids (chunk_id) VALUES (?)", (chunk_id,)
+            )
+            if cursor.rowcount:
+                conn.execute(
+                    f"INSERT INTO {table} (rowid, content) VALUES (?, ?)",
+                    (cursor.lastrowid, text),
+                )
+
+    def add(self, collection_name: str, ids: Sequence[str], texts: Sequence[str]) -> None:
+        table = self._table(collection_name)
+        with self._lock:
+            conn = self._connect()
+            self._insert(conn, table, ids, texts)
+            conn.commit()
+
+    def remove(self, collection_name: str, ids: Sequence[str]) -> None:
+        table = self._table(collection_name)
+        with self._lock:
+            conn = self._connect()
+            for start, end in _iter_batches(len(ids), _SQLITE_MAX_PARAMS):
+                batch = list(ids[start:end])
+                placeholders = ", ".join("?" for _ in batch)
+                rowids = [
+                    (row[0],)
+                    for row in conn.execute(
+                        f"SELECT rowid FROM {table}_ids WHERE chunk_id IN ({placeholders})",
+                        batch,
+                    )
+                ]
+                conn.executemany(f"DELETE FROM {table} WHERE rowid = ?", rowids)
+                conn.executemany(f"DELETE FROM {table}_ids WHERE rowid = ?", rowids)
+            conn.commit()
+
+    @staticmethod
+    def _match_count(conn: sqlite3.Connection, table: str, phrase: str, cap: int) -> int:
+        """Number of chunks matching ``phrase``, counted up to ``cap + 1``."""
+        return conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT rowid FROM {table} WHERE {table} MATCH ? LIMIT ?)",
+            (phrase, cap + 1),
+        ).fetchone()[0]
+
+    def search(self, collection_name: str, query: str, limit: int) -> list[str]:
+        """Return up to ``limit`` chunk ids, best BM25 match first.
+
+        Phrases matching more than LEXICAL_MAX_MATCHES chunks are dropped:
+        ranking them would score their whole posting list, and a term that
+        common carries almost no BM25 weight anyway (the vector side still
+        sees it). Each phrase is probed with a capped count first, so the
+        cost is bounded by the cap rather than by the collection size.
+        """
+        phrases = _fts_phrases(query)
+        if not phrases:
+            return []
+        table = self._table(collection_name)
+        with self._lock:
+            conn = self._connect()
+            selective = [
+                phrase
+                for phrase in phrases
+                if self._match_count(conn, table, phrase, LEXICAL_MAX_MATCHES) <= LEXICAL_MAX_MATCHES
+            ]
+            if not selective:
+                incr("vector_store.lexical.too_common")
+                return []
+            match = " OR ".join(selective)
+            rowids = [
+                row[0]
+                for row in conn.execute(
+                    f"SELECT rowid FROM {table} WHERE {table} MATCH ? ORDER BY rank LIMIT ?",
+                    (match, limit),
+                )
+            ]
+            if not rowids:
+                return []
+            placeholders = ", ".join("?" for _ in rowids)
+            chunk_ids = dict(
+                conn.execute(
+                    f"SELECT rowid, chunk_id FROM {table}_ids WHERE rowid IN ({placeholders})",
+                    rowids,
+                ).fetchall()
+            )
+        return [chunk_ids[rowid] for rowid in rowids if rowid in chunk_ids]
+
+    def close(self) -> None:
+        with self._lock:
+            conn, self._conn = self._conn, None
+            self._ready.clear()
+        if conn is not None:
+            conn.close()
+
+
+_lexical_index = LexicalIndex(PERSIST_DIRECTORY / "lexical_index.db")
+
 
 class SentenceTransformerEmbeddings(Embeddings):
-    """LangChain-compatible wrapper for sentence-transformers embeddings."""
+    """LangChain-compatible wrapper for sentence-transformers embeddings.
 
-    def __init__(self, model_name: str):
+    Documents are encoded in explicit batches. With ``num_workers > 1`` large
+    inputs are spread over a CPU multi-process pool started on first use. When
+    a cache is given, only texts never seen by this model are encoded.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        num_workers: int = EMBEDDING_WORKERS,
+        pool_min_texts: int = EMBEDDING_POOL_MIN_TEXTS,
+        cache: EmbeddingCache | None = None,
+    ):
         self.model_name = model_name
+        self.batch_size = max(1, int(batch_size))
+        self.num_workers = max(1, int(num_workers))
+        self.pool_min_texts = max(1, int(pool_min_texts))
+        self.cache = cache
         self._model = None
+        self._pool = None
+        self._pool_lock = threading.Lock()
 
     def _ensure_model(self):
         if self._model is None:
             from sentence_transformers import SentenceTransformer
 
             log(f"vector_store: loading embedding model '{self.model_name}'")
-            self._model = SentenceTransformer(self.model_name)
+            self._model = SentenceTransformer(self.model_name, device="cpu")
         return self._model
 
-    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+    def _ensure_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                model = self._ensure_model()
+                log(f"vector_store: starting embedding pool with {self.num_workers} workers")
+                self._pool = model.start_multi_process_pool(
+                    target_devices=["cpu"] * self.num_workers
+                )
+            return self._pool
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Return a float32 matrix with one embedding row per text."""
+        items = list(texts)
+        if not items:
+            return np.empty((0, 0), dtype=np.float32)
+        if self.cache is None:
+            return self._encode_uncached(items)
+
+        digests = [_content_digest(text) for text in items]
+        vectors = self.cache.get_many(self.model_name, digests)
+        pending: dict[str, str] = {}
+        for digest, text in zip(digests, items):
+            if digest not in vectors:
+                pending.setdefault(digest, text)
+
+        if pending:
+            fresh = self._encode_uncached(list(pending.values()))
+            computed = dict(zip(pending.keys(), fresh))
+            self.cache.put_many(self.model_name, computed)
+            vectors.update(computed)
+
+        log(
+            f"vector_store: embeddings cache {len(items) - len(pending)} hits, "
+            f"{len(pending)} computed"
+        )
+        return np.stack([vectors[digest] for digest in digests]).astype(np.float32, copy=False)
+
+    def _encode_uncached(self, items: list[str]) -> np.ndarray:
         model = self._ensure_model()
-        return model.encode(texts).tolist()
+        if self.num_workers > 1 and len(items) >= self.pool_min_texts:
+            vectors = model.encode_multi_process(
+                items, self._ensure_pool(), batch_size=self.batch_size
+            )
+        else:
+            vectors = model.encode(
+                items,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+        return np.asarray(vectors, dtype=np.float32)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.encode(texts).tolist()
 
     def embed_query(self, text: str) -> list[float]:
-        model = self._ensure_model()
-        return model.encode(text).tolist()
+        # the model is case-sensitive: key on exactly the string that gets encoded
+        normalized = _normalize_query(text)
+        key = (self.model_name, normalized)
+        vector = _cache_get(_query_embedding_cache, key, "vector_store.query_embedding")
+        if vector is None:
+            model = self._ensure_model()
+            vector = np.asarray(model.encode(normalized, convert_to_numpy=True), dtype=np.float32)
+            _cache_put(_query_embedding_cache, key, vector)
+        return vector.tolist()
+
+    def close(self) -> None:
+        """Stop the multi-process pool and release the cache connection."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None and self._model is not None:
+            self._model.stop_multi_process_pool(pool)
+            log("vector_store: embedding pool stopped")
+        if self.cache is not None:
+            self.cache.close()
 
 
 def _normalize_collection_name(collection_name: str | None) -> str:
@@ -56,12 +609,6 @@ def _ensure_persist_dir() -> None:
     PERSIST_DIRECTORY.mkdir(parents=True, exist_ok=True)
 
 
-def _normalize_texts(texts: Sequence[str]) -> list[str]:
-    if isinstance(texts, str):
-        texts = [texts]
-    return [text.strip() for text in texts if isinstance(text, str) and text.strip()]
-
-
 def _normalize_metadatas(
     metadatas: Sequence[Mapping[str, Any]] | None, total: int
 ) -> list[dict[str, Any]]:
@@ -79,10 +626,45 @@ def _normalize_metadatas(
     return normalized
 
 
+def _iter_batches(total: int, size: int):
+    for start in range(0, total, max(1, size)):
+        yield start, min(total, start + size)
+
+
+def _upsert_records(
+    collection,
+    ids: list[str],
+    embeddings: np.ndarray,
+    texts: list[str],
+    metadatas: list[dict[str, Any]],
+) -> None:
+    # Chroma rejects empty metadata dicts, so records without metadata go apart.
+    with_meta = [i for i, metadata in enumerate(metadatas) if metadata]
+    without_meta = [i for i, metadata in enumerate(metadatas) if not metadata]
+    if with_meta:
+        collection.upsert(
+            ids=[ids[i] for i in with_meta],
+            embeddings=embeddings[with_meta],
+            documents=[texts[i] for i in with_meta],
+            metadatas=[metadatas[i] for i in with_meta],
+        )
+    if without_meta:
+        collection.upsert(
+            ids=[ids[i] for i in without_meta],
+            embeddings=embeddings[without_meta],
+            documents=[texts[i] for i in without_meta],
+        )
+
+
 @st.cache_resource
-def get_embedding_model(model_name: str = DEFAULT_EMBEDDING_MODEL) -> Embeddings:
+def get_embedding_model(
+    model_name: str = DEFAULT_EMBEDDING_MODEL,
+) -> SentenceTransformerEmbeddings:
     """Return a cached embedding model instance."""
-    return SentenceTransformerEmbeddings(model_name=model_name)
+    cache = None
+    if EMBEDDING_CACHE_MAX_ENTRIES > 0:
+        cache = EmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES)
+    return SentenceTransformerEmbeddings(model_name=model_name, cache=cache)
 
 
 @st.cache_resource
@@ -108,41 +690,350 @@ def get_vectorstore(collection_name: str = DEFAULT_COLLECTION_NAME) -> Chroma:
     )
 
 
+def _get_collection(collection_name: str = DEFAULT_COLLECTION_NAME):
+    """Return the raw Chroma collection backing the LangChain store."""
+    client = get_chroma_client()
+    return client.get_or_create_collection(
+        name=_normalize_collection_name(collection_name),
+        embedding_function=None,
+    )
+
+
+def _source_key(metadata: Mapping[str, Any]) -> str:
+    """Identity of the upload a chunk belongs to: ``source_key``, else ``source``.
+
+    ``source`` is the bare filename, which two uploaders can share (e.g. a
+    ``relatorio.pdf`` per sector in a shared collection); ``source_key`` adds
+    the owner so their re-uploads never prune each other's chunks.
+    """
+    return str(metadata.get("source_key") or metadata.get("source") or "")
+
+
+def _with_source_key(source: str, owner: Any = None) -> str:
+    return f"{owner}/{source}" if owner is not None else source
+
+
+def _chunk_id(text: str, metadata: Mapping[str, Any]) -> str:
+    """Deterministic id derived from (source key, chunk_index, content digest)."""
+    chunk_index = str(metadata.get("chunk_index", ""))
+    key = "\x1f".join((_source_key(metadata), chunk_index, _content_digest(text)))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _existing_ids(collection, ids: Sequence[str]) -> set[str]:
+    found: set[str] = set()
+    for start, end in _iter_batches(len(ids), CHROMA_WRITE_BATCH_SIZE):
+        found.update(collection.get(ids=list(ids[start:end]), include=[])["ids"])
+    return found
+
+
+def _iter_stored_documents(collection) -> Iterable[tuple[list[str], list[str]]]:
+    total = collection.count()
+    for start, end in _iter_batches(total, CHROMA_WRITE_BATCH_SIZE):
+        result = collection.get(limit=end - start, offset=start, include=["documents"])
+        yield result["ids"], [text or "" for text in result["documents"]]
+
+
+def _ensure_lexical_index(collection) -> None:
+    _lexical_index.ensure(collection.name, lambda: _iter_stored_documents(collection))
+
+
+def _delete_stale_chunks(collection, source: str, source_key: str, keep_ids: set[str]) -> int:
+    """Delete chunks of the upload ``source_key`` whose ids are not in ``keep_ids``.
+
+    Chunks are looked up by filename (``source``); those stored before
+    ``source_key`` existed have no owner and count as the same upload.
+    """
+    stored = collection.get(where={"source": source}, include=["metadatas"])
+    stale = [
+        chunk_id
+        for chunk_id, metadata in zip(stored["ids"], stored["metadatas"])
+        if chunk_id not in keep_ids
+        and (metadata or {}).get("source_key", source_key) == source_key
+    ]
+    for start, end in _iter_batches(len(stale), CHROMA_WRITE_BATCH_SIZE):
+        collection.delete(ids=stale[start:end])
+        _lexical_index.remove(collection.name, stale[start:end])
+    return len(stale)
+
+
+def _build_records(
+    texts: Sequence[str], metadatas: Sequence[Mapping[str, Any]] | None
+) -> dict[str, tuple[str, dict[str, Any]]]:
+    if isinstance(texts, str):
+        texts = [texts]
+    raw_metadatas = _normalize_metadatas(metadatas, len(texts))
+
+    records: dict[str, tuple[str, dict[str, Any]]] = {}
+    for text, metadata in zip(texts, raw_metadatas):
+        cleaned = text.strip() if isinstance(text, str) else ""
+        if cleaned:
+            records.setdefault(_chunk_id(cleaned, metadata), (cleaned, metadata))
+    return records
+
+
+def _write_records(collection, records: Mapping[str, tuple[str, dict[str, Any]]]) -> int:
+    """Embed and upsert records whose ids are not stored yet; return how many.
+
+    The lexical index receives the same records right after each Chroma batch.
+    """
+    _ensure_lexical_index(collection)
+    ids = list(records)
+    existing = _existing_ids(collection, ids)
+    pending = [chunk_id for chunk_id in ids if chunk_id not in existing]
+    if pending:
+        embedder = get_embedding_model()
+    for start, end in _iter_batches(len(pending), CHROMA_WRITE_BATCH_SIZE):
+        batch_ids = pending[start:end]
+        batch_texts = [records[chunk_id][0] for chunk_id in batch_ids]
+        _upsert_records(
+            collection,
+            ids=batch_ids,
+            embeddings=embedder.encode(batch_texts),
+            texts=batch_texts,
+            metadatas=[records[chunk_id][1] for chunk_id in batch_ids],
+        )
+        _lexical_index.add(collection.name, batch_ids, batch_texts)
+    return len(pending)
+
+
+def get_collection_version(collection_name: str = DEFAULT_COLLECTION_NAME) -> str:
+    """Return an opaque token that changes whenever the collection content changes."""
+    return _collection_versions.get(_normalize_collection_name(collection_name))
+
+
+def _bump_collection_version(collection_name: str) -> None:
+    try:
+        _collection_versions.bump(_normalize_collection_name(collection_name))
+    except Exception as exc:
+        log(f"vector_store: failed to bump collection version: {exc}")
+
+
 def add_documents_to_db(
     texts: Sequence[str],
     metadatas: Sequence[Mapping[str, Any]] | None = None,
     collection_name: str = DEFAULT_COLLECTION_NAME,
+    prune_stale: bool = True,
 ) -> bool:
-    """Persist text chunks and optional metadata into the vector store."""
-    cleaned_texts = _normalize_texts(texts)
-    if not cleaned_texts:
+    """Idempotently upsert text chunks and optional metadata into the vector store.
+
+    Chunks get deterministic ids, so unchanged chunks are skipped. With
+    ``prune_stale`` chunks of the same ``source`` that are absent from this
+    call are deleted, which keeps a re-uploaded file from accumulating copies.
+    """
+    records = _build_records(texts, metadatas)
+    if not records:
         log("vector_store: no valid texts to add")
         return False
 
-    normalized_metadatas = _normalize_metadatas(metadatas, len(cleaned_texts))
-    docs = [
-        Document(page_content=text, metadata=metadata)
-        for text, metadata in zip(cleaned_texts, normalized_metadatas)
-    ]
-
     try:
-        db = get_vectorstore(collection_name)
-        db.add_documents(docs)
+        collection = _get_collection(collection_name)
+        added = _write_records(collection, records)
+
+        removed = 0
+        if prune_stale:
+            keep_ids = set(records)
+            sources = {
+                (str(metadata["source"]), _source_key(metadata))
+                for _, metadata in records.values()
+                if metadata.get("source")
+            }
+            for source, source_key in sources:
+                removed += _delete_stale_chunks(collection, source, source_key, keep_ids)
+
+        if added or removed:
+            _bump_collection_version(collection_name)
         log(
-            "vector_store: added "
-            f"{len(docs)} docs to '{_normalize_collection_name(collection_name)}'"
+            f"vector_store: '{_normalize_collection_name(collection_name)}' "
+            f"added {added}, unchanged {len(records) - added}, removed {removed}"
         )
         return True
     except Exception as exc:
+        # escrita parcial pode ter ocorrido: invalida caches por garantia
+        _bump_collection_version(collection_name)
         log(f"vector_store: add_documents_to_db error: {exc}")
         return False
 
 
+def add_document_batches(
+    batches: Iterable[tuple[Sequence[str], Sequence[Mapping[str, Any]]]],
+    source: str,
+    collection_name: str = DEFAULT_COLLECTION_NAME,
+    owner: Any = None,
+) -> bool:
+    """Upsert a stream of (texts, metadatas) batches belonging to one upload.
+
+    Batches are consumed and written one at a time, so the caller can produce
+    them lazily. Each chunk is tagged with ``source_key`` (``owner``/``source``)
+    and, once the stream ends, stale chunks of that same upload are pruned;
+    another owner's file with the same name is left alone.
+    """
+    source_key = _with_source_key(source, owner)
+    try:
+        collection = _get_collection(collection_name)
+        keep_ids: set[str] = set()
+        added = 0
+        for texts, metadatas in batches:
+            metadatas = [
+                {**metadata, "source_key": source_key}
+                for metadata in _normalize_metadatas(metadatas, len(texts))
+            ]
+            records = _build_records(texts, metadatas)
+            keep_ids.update(records)
+            added += _write_records(collection, records)
+
+        if not keep_ids:
+            log("vector_store: no valid texts to add")
+            return False
+
+        removed = _delete_stale_chunks(collection, source, source_key, keep_ids)
+        if added or removed:
+            _bump_collection_version(collection_name)
+        log(
+            f"vector_store: '{_normalize_collection_name(collection_name)}' "
+            f"streamed {len(keep_ids)} chunks of '{source_key}' "
+            f"(added {added}, removed {removed})"
+        )
+        return True
+    except Exception as exc:
+        _bump_collection_version(collection_name)
+        log(f"vector_store: add_document_batches error: {exc}")
+        return False
+
+
+def _documents_by_ids(collection, chunk_ids: Sequence[str]) -> list[Document]:
+    if not chunk_ids:
+        return []
+    result = collection.get(ids=list(chunk_ids), include=["documents", "metadatas"])
+    found = {
+        chunk_id: Document(id=chunk_id, page_content=text or "", metadata=metadata or {})
+        for chunk_id, text, metadata in zip(
+            result["ids"], result["documents"], result["metadatas"]
+        )
+    }
+    return [found[chunk_id] for chunk_id in chunk_ids if chunk_id in found]
+
+
+def _lazy_query_embedding(normalized_query: str):
+    """Return a getter that embeds the query at most once, and only if asked."""
+    lock = threading.Lock()
+    value: list[list[float]] = []
+
+    def _get() -> list[float]:
+        with lock:
+            if not value:
+                value.append(get_embedding_model().embed_query(normalized_query))
+            return value[0]
+
+    return _get
+
+
+def _vector_search(collection, top_k: int, get_embedding) -> list[Document]:
+    result = collection.query(
+        query_embeddings=[get_embedding()],
+        n_results=top_k,
+        include=["documents", "metadatas"],
+    )
+    return [
+        Document(id=chunk_id, page_content=text or "", metadata=metadata or {})
+        for chunk_id, text, metadata in zip(
+            result["ids"][0], result["documents"][0], result["metadatas"][0]
+        )
+    ]
+
+
+def _lexical_search(collection, normalized_query: str, top_k: int) -> list[Document] | None:
+    """BM25 matches, or None while the collection's index is still being built."""
+    if not _lexical_index.is_ready(collection.name):
+        # nunca backfill no caminho da pergunta: esta consulta fica so vetorial
+        _lexical_index.ensure_in_background(
+            collection.name, lambda: _iter_stored_documents(collection)
+        )
+        return None
+    chunk_ids = _lexical_index.search(collection.name, normalized_query, top_k)
+    return _documents_by_ids(collection, chunk_ids)
+
+
+def _search_collection(
+    name: str, normalized_query: str, top_k: int, get_embedding, mode: str
+) -> list:
+    cache_key = (name, get_collection_version(name), normalized_query, top_k, mode)
+    collection = _get_collection(name)
+    chunk_ids = _cache_get(_retrieval_cache, cache_key, "vector_store.retrieval")
+    if chunk_ids is not None:
+        return _documents_by_ids(collection, chunk_ids)
+
+    docs = _vector_search(collection, top_k, get_embedding)
+    cacheable = True
+    if mode == "hybrid":
+        try:
+            lexical_docs = _lexical_search(collection, normalized_query, top_k)
+        except Exception as exc:
+            # sem indice lexical a busca continua so vetorial
+            log(f"vector_store: lexical search error in '{name}': {exc}")
+            lexical_docs = None
+        if lexical_docs is None:
+            # resultado so vetorial nao deve ocupar a chave hibrida depois do backfill
+            cacheable = False
+        elif lexical_docs:
+            docs = _reciprocal_rank_fusion([docs, lexical_docs], top_k)
+    if cacheable:
+        _cache_put(_retrieval_cache, cache_key, tuple(doc.id for doc in docs))
+    return docs
+
+
+def _get_search_executor() -> ThreadPoolExecutor:
+    global _search_executor
+    with _search_executor_lock:
+        if _search_executor is None:
+            _search_executor = ThreadPoolExecutor(
+                max_workers=max(1, FEDERATED_SEARCH_WORKERS),
+                thread_name_prefix="vector-search",
+            )
+        return _search_executor
+
+
+def _reciprocal_rank_fusion(result_lists: Sequence[list], k: int) -> list:
+    """Merge ranked lists: score = sum of 1 / (RRF_K + rank) over the lists."""
+    scores: dict[str, float] = {}
+    docs_by_id: dict[str, Document] = {}
+    for docs in result_lists:
+        for rank, doc in enumerate(docs, start=1):
+            scores[doc.id] = scores.get(doc.id, 0.0) + 1.0 / (RRF_K + rank)
+            docs_by_id.setdefault(doc.id, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [docs_by_id[chunk_id] for chunk_id in ranked[:k]]
+
+
+def _collection_names(collection_name: str | Sequence[str] | None) -> list[str]:
+    if collection_name is None or isinstance(collection_name, str):
+        return [_normalize_collection_name(collection_name)]
+    names = [_normalize_collection_name(name) for name in collection_name if name]
+    return list(dict.fromkeys(names)) or [DEFAULT_COLLECTION_NAME]
+
+
 def search_context(
-    query: str, k: int = 4, collection_name: str = DEFAULT_COLLECTION_NAME
+    query: str,
+    k: int = 4,
+    collection_name: str | Sequence[str] = DEFAULT_COLLECTION_NAME,
+    mode: str | None = None,
 ) -> list:
-    """Return top-k similar chunks for the query."""
-    normalized_query = (query or "").strip()
+    """Return top-k similar chunks for the query.
+
+    Results are cached per (collection, content version, normalized query, k)
+    as chunk ids, so a repeated question against an unchanged collection
+    skips both the query embedding and the ANN search.
+
+    collection_name may be a list: the collections are searched in parallel
+    (sharing one query embedding) and merged with reciprocal-rank fusion.
+    Distances from different collections are not comparable, so fusion uses
+    only each chunk's rank within its own collection.
+
+    ``mode="hybrid"`` (default, see RETRIEVAL_MODE) also runs a BM25 lookup
+    on the collection's lexical index and fuses it with the vector ranking
+    the same way, so exact identifiers missed by the embeddings still surface.
+    """
+    normalized_query = _normalize_query(query)
     if not normalized_query:
         return []
 
@@ -151,12 +1042,33 @@ def search_context(
     except Exception:
         top_k = 4
 
-    try:
-        db = get_vectorstore(collection_name)
-        return db.similarity_search(normalized_query, k=top_k)
-    except Exception as exc:
-        log(f"vector_store: search_context error: {exc}")
-        return []
+    search_mode = (mode or RETRIEVAL_MODE).strip().lower()
+    names = _collection_names(collection_name)
+    get_embedding = _lazy_query_embedding(normalized_query)
+    if len(names) == 1:
+        try:
+            return _search_collection(
+                names[0], normalized_query, top_k, get_embedding, search_mode
+            )
+        except Exception as exc:
+            log(f"vector_store: search_context error: {exc}")
+            return []
+
+    executor = _get_search_executor()
+    futures = {
+        name: executor.submit(
+            _search_collection, name, normalized_query, top_k, get_embedding, search_mode
+        )
+        for name in names
+    }
+    result_lists = []
+    for name, future in futures.items():
+        try:
+            result_lists.append(future.result())
+        except Exception as exc:
+            # one broken collection must not take down the others
+            log(f"vector_store: search_context error in '{name}': {exc}")
+    return _reciprocal_rank_fusion(result_lists, top_k)
 
 
 def clear_database() -> None:
@@ -168,6 +1080,10 @@ def clear_database() -> None:
 
 
 def _clear_vector_resources() -> None:
+    _clear_query_caches()
+    _collection_versions.close()
+    _lexical_index.close()
+
     try:
         get_vectorstore.clear()
     except Exception:
@@ -178,6 +1094,11 @@ def _clear_vector_resources() -> None:
     except Exception:
         pass
 
+    try:
+        get_embedding_model().close()
+    except Exception:
+        pass
+
     try:
         get_embedding_model.clear()
     except Exception:
@@ -39,6 +39,12 @@ ROUTES: Dict[str, Dict[str, object]] = {
         "callable": "main",
         "roles": ["ADMIN"],
     },
+    "analytics": {
+        "title": "Analytics",
+        "module": "Pages.analytics",
+        "callable": "main",
+        "roles": ["ADMIN"],
+    },
 }
 
 DEFAULT_ROUTE = "index"
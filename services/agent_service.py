@@ -4,7 +4,7 @@ import json
 import copy
 from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Sequence
 
 AGENTS_FILE = Path("agents_config.json")
 DEFAULT_AGENTS: dict[str, dict[str, Any]] = {
@@ -60,8 +60,27 @@ def save_agents(agents_data: dict[str, dict[str, Any]]) -> None:
     _load_agents_cached.cache_clear()
 
 
-def create_agent(agent_id: str, name: str, role: str, system_prompt: str) -> bool:
-    """Cria um novo agente e salva no arquivo."""
+def get_agent_collections(agent: dict[str, Any]) -> list[str]:
+    """
+    Colecoes consultadas pelo agente. A propria (collection_name, destino dos
+    uploads) vem primeiro, seguida das extras de "collection_names", sem repetir.
+    """
+    names = [agent.get("collection_name"), *(agent.get("collection_names") or [])]
+    return list(dict.fromkeys(name for name in names if name)) or ["corporate_docs"]
+
+
+def create_agent(
+    agent_id: str,
+    name: str,
+    role: str,
+    system_prompt: str,
+    shared_collections: Sequence[str] = (),
+) -> bool:
+    """Cria um novo agente e salva no arquivo.
+
+    shared_collections: colecoes extras (ex.: "corporate_docs") consultadas
+    junto com a colecao propria do agente.
+    """
     agents = load_agents()
     collection_name = f"collection_{agent_id}"
     agents[agent_id] = {
@@ -70,6 +89,10 @@ def create_agent(agent_id: str, name: str, role: str, system_prompt: str) -> boo
         "system_prompt": system_prompt,
         "collection_name": collection_name,
     }
+    if shared_collections:
+        agents[agent_id]["collection_names"] = get_agent_collections(
+            {"collection_name": collection_name, "collection_names": list(shared_collections)}
+        )
     save_agents(agents)
     return True
 
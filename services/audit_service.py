@@ -1,64 +1,142 @@
+import datetime
+import os
 
 import pandas as pd
 
-##Precisa importar os arquivos de dados dos tokens
+from database import connection
 
 #Nesse arquivo estamos auth_service.py estamos criando as contabilizações de uso - Tokens - por setores
-# Estamos contabilizando os dados totais e rankeando o setor que possui maior gasto com tokens para o menor 
-
-
-
-def gerar_tabela_ranking_custos(dados_uso):
-    """
-    Gera uma tabela consolidada de custos por setor, 
-    ordenada do maior para o menor gasto.
-    """
-    
-    
-    # --- PARTE PARA SUBSTITUIR OS PREÇOS (MANUALMENTE) ---
-    # Altere o valor abaixo conforme o custo real da sua API
-
-    #-----------------------------------------------------------------------------------------------------------------
-    # Localizar o preço atual com o Irlan dentro do código e substituir aqui 
-    PRECO_POR_1K_TOKENS = 52.00  # Exemplo: R$ 52,00 por 1000 tokens
-    # -----------------------------------------------------------------------------------------------------------------
-
-
-    # 1. Transformar dados brutos em DataFrame
-    df = pd.DataFrame(dados_uso)    
+# Estamos contabilizando os dados totais e rankeando o setor que possui maior gasto com tokens para o menor
+# Os dados vêm da tabela llm_usage, já agregada por dia em usage_daily_setor / usage_daily_user
+# (mantidas por services/usage_service.py a cada gravação)
+
+#-----------------------------------------------------------------------------------------------------------------
+# Localizar o preço atual com o Irlan dentro do código e substituir aqui (ou via .env)
+PRECO_POR_1K_TOKENS = float(os.getenv("PRECO_POR_1K_TOKENS", "52.00"))  # Exemplo: R$ 52,00 por 1000 tokens
+# -----------------------------------------------------------------------------------------------------------------
+
+COLUNAS_RANKING = ['setor', 'total_usuarios', 'total_interacoes', 'tokens_acumulados', 'custo_financeiro']
+
+RANKING_SQL = """
+    SELECT
+        s.setor,
+        COALESCE(u.total_usuarios, 0) AS total_usuarios,
+        s.total_interacoes,
+        s.tokens_acumulados,
+        s.tokens_acumulados / 1000.0 * ? AS custo_financeiro
+    FROM (
+        SELECT setor, SUM(requests) AS total_interacoes, SUM(total_tokens) AS tokens_acumulados
+        FROM usage_daily_setor
+        WHERE day BETWEEN ? AND ?
+        GROUP BY setor
+    ) AS s
+    LEFT JOIN (
+        SELECT setor, COUNT(DISTINCT user_id) AS total_usuarios
+        FROM usage_daily_user
+        WHERE day BETWEEN ? AND ?
+        GROUP BY setor
+    ) AS u ON u.setor = s.setor
+    ORDER BY custo_financeiro DESC
+"""
+
+
+def _dia(valor, padrao: str) -> str:
+    """Converte date/datetime/str para o formato 'AAAA-MM-DD' usado nos agregados."""
+    if valor is None:
+        return padrao
+    if isinstance(valor, (datetime.date, datetime.datetime)):
+        return valor.strftime("%Y-%m-%d")
+    return str(valor)[:10]
+
+
+def _ranking_de_dados(dados_uso, preco_por_1k_tokens: float):
+    # Caminho antigo: agrega em memória uma lista de interações já carregada
+    df = pd.DataFrame(dados_uso)
 
     # Verificação de segurança: garante que as colunas essenciais existem
     # Aqui contabilizamos setor, usuário e tokens gastos para cada interação
-
     colunas_necessarias = ['setor', 'usuario', 'tokens_gastos']
     for col in colunas_necessarias:
         if col not in df.columns:
             raise ValueError(f"A coluna '{col}' é obrigatória nos dados de entrada.")
-        
-
-    # 2. Agrupamentos por setor e soma dos tokens gastos 
-    # Dados     
 
     tabela_setores = df.groupby('setor').agg(
-        total_usuarios=('usuario', 'nunique'),    # Pessoas únicas e contabiliza quantas vezes essas pessoas unicas usaram o sistema 
+        total_usuarios=('usuario', 'nunique'),    # Pessoas únicas
         total_interacoes=('usuario', 'count'),    # Total de vezes que usaram
         tokens_acumulados=('tokens_gastos', 'sum') # Soma dos tokens
     ).reset_index()
+    tabela_setores['custo_financeiro'] = (tabela_setores['tokens_acumulados'] / 1000) * preco_por_1k_tokens
+    return tabela_setores.sort_values(by='custo_financeiro', ascending=False)
+
+
+def _ranking_do_banco(data_inicio, data_fim, preco_por_1k_tokens: float):
+    # Consulta só os agregados diários: o custo não cresce com o histórico bruto
+    inicio = _dia(data_inicio, "0000-01-01")
+    fim = _dia(data_fim, "9999-12-31")
+    conn = connection.get_connection()
+    if conn is None:
+        return pd.DataFrame(columns=COLUNAS_RANKING)
+    try:
+        return pd.read_sql_query(
+            RANKING_SQL,
+            conn,
+            params=(preco_por_1k_tokens, inicio, fim, inicio, fim),
+        )
+    finally:
+        conn.close()
+
+
+def gerar_tabela_ranking_custos(
+    dados_uso=None,
+    data_inicio=None,
+    data_fim=None,
+    preco_por_1k_tokens: float = PRECO_POR_1K_TOKENS,
+    exibir: bool = True,
+):
+    """
+    Gera uma tabela consolidada de custos por setor,
+    ordenada do maior para o menor gasto.
 
-    # 3. Criando coluna de custos total por setor
-    # Cálculo: (Soma de Tokens / 1000) * Preço - Estamos contabilizando o custo por tokens a cada 1000 tokens
-    tabela_setores['custo_financeiro'] = (tabela_setores['tokens_acumulados'] / 1000) * PRECO_POR_1K_TOKENS
-
-    # 4. Ordenar do maior para o menor gasto
-    tabela_ranking = tabela_setores.sort_values(by='custo_financeiro', ascending=False)
+    Sem dados_uso, consulta os agregados diários do banco no intervalo
+    [data_inicio, data_fim] (datas inclusivas; None = sem limite).
+    Cálculo do custo: (Soma de Tokens / 1000) * preco_por_1k_tokens.
+    """
+    if dados_uso is not None:
+        tabela_ranking = _ranking_de_dados(dados_uso, preco_por_1k_tokens)
+    else:
+        tabela_ranking = _ranking_do_banco(data_inicio, data_fim, preco_por_1k_tokens)
+
+    # Exibir a tabela final
+    if exibir:
+        print("\n" + "="*80)
+        print("RANKING DE CUSTOS POR SETOR")
+        print("="*80)
+        print(tabela_ranking.to_string(index=False))
+        print("="*80 + "\n")
 
-    # 5. Exibir a tabela final
+    return tabela_ranking
 
-    print("\n" + "="*80)
-    print("RANKING DE CUSTOS POR SETOR")
-    print("="*80)
-    print(tabela_ranking.to_string(index=False))
-    print("="*80 + "\n")
 
-    return tabela_ranking
-#oioioi
+def requisicoes_por_agente(data_inicio=None, data_fim=None):
+    """
+    Requisições e tokens por agente e por dia no intervalo (agregados diários).
+    Retorna DataFrame com as colunas day, agent_id, requests e total_tokens.
+    """
+    inicio = _dia(data_inicio, "0000-01-01")
+    fim = _dia(data_fim, "9999-12-31")
+    conn = connection.get_connection()
+    if conn is None:
+        return pd.DataFrame(columns=['day', 'agent_id', 'requests', 'total_tokens'])
+    try:
+        return pd.read_sql_query(
+            """
+            SELECT day, agent_id, requests, total_tokens
+            FROM usage_daily_agent
+            WHERE day BETWEEN ? AND ?
+            ORDER BY day, agent_id
+            """,
+            conn,
+            params=(inicio, fim),
+        )
+    finally:
+        conn.close()
@@ -2,12 +2,10 @@
 
 from __future__ import annotations
 
-import json
-
 import streamlit as st
 
 from routes.routes import DEFAULT_ROUTE, ROUTES
-from services.auth_service import require_auth
+from services.auth_service import check_auth
 from utils.debug import log, time_block
 from utils.rerun import safe_rerun
 
@@ -51,18 +49,18 @@ def _is_authenticated() -> bool:
         st.session_state["authenticated"] = False
         return False
     try:
-        with time_block("auth_guard: require_auth"):
-            result = json.loads(require_auth(token))
+        with time_block("auth_guard: check_auth"):
+            result = check_auth(token)
     except Exception as exc:
-        log(f"auth_guard: require_auth error: {exc}")
+        log(f"auth_guard: check_auth error: {exc}")
         _clear_auth_state()
         return False
-    if not result.get("success"):
+    if not result.success:
         log("auth_guard: token invalid or expired")
         _clear_auth_state()
         return False
-    st.session_state["user"] = result.get("user")
-    st.session_state["role"] = result.get("user", {}).get("role")
+    st.session_state["user"] = result.user
+    st.session_state["role"] = result.user.get("role")
     st.session_state["authenticated"] = True
     log("auth_guard: ok")
     return True
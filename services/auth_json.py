@@ -0,0 +1,61 @@
+"""Adaptador JSON de services.auth_service.
+
+Mantem o contrato antigo (funcoes retornando string JSON) para quem ainda
+consome a API dessa forma. A UI usa os resultados tipados de auth_service.
+"""
+
+from __future__ import annotations
+
+import json
+
+from services import auth_service
+
+
+def _dumps(result: auth_service.ServiceResult) -> str:
+    return json.dumps(result.to_dict())
+
+
+def login(email: str, password: str, client_ip: str | None = None) -> str:
+    return _dumps(auth_service.login(email, password, client_ip))
+
+
+def require_auth(token: str, required_role: str | list[str] | set[str] | None = None) -> str:
+    return _dumps(auth_service.check_auth(token, required_role))
+
+
+def criar_usuario(token: str, usuario: str, email: str, password: str, nivel: int, setor: str) -> str:
+    return _dumps(auth_service.criar_usuario(token, usuario, email, password, nivel, setor))
+
+
+def cadastro_publico_usuario(
+    usuario: str, email: str, password: str, setor: str, client_ip: str | None = None
+) -> str:
+    return _dumps(auth_service.cadastro_publico_usuario(usuario, email, password, setor, client_ip))
+
+
+def listar_usuarios(token: str) -> str:
+    return _dumps(auth_service.listar_usuarios(token))
+
+
+def alterar_nivel_acesso(token: str, target_user_id: int, novo_nivel: int) -> str:
+    return _dumps(auth_service.alterar_nivel_acesso(token, target_user_id, novo_nivel))
+
+
+def atualizar_usuario(
+    token: str,
+    target_user_id: int,
+    usuario: str | None = None,
+    email: str | None = None,
+    password: str | None = None,
+    nivel: int | None = None,
+    setor: str | None = None,
+) -> str:
+    return _dumps(
+        auth_service.atualizar_usuario(
+            token, target_user_id, usuario, email, password, nivel, setor
+        )
+    )
+
+
+def deletar_usuario(token: str, target_user_id: int) -> str:
+    return _dumps(auth_service.deletar_usuario(token, target_user_id))
@@ -1,15 +1,24 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from typing import Any, Optional
 
-import bcrypt
 import datetime
+import hashlib
 import json
 import jwt
 import re
+import sqlite3
+import threading
+import time
+
+from cachetools import LRUCache
 
 from config.settings import SECRET_KEY, ALGORITHM, ISSUER, TOKEN_TTL_HOURS
 from database import connection
+from services.hashing_service import HashingBusy, check_password
+from services.hashing_service import hash_password as _pool_hash_password
+from services.rate_limiter import per_minute
 
 ROLE_MAP = {0: "ADMIN", 1: "NORMAL", 2: "COMPLIANCE"}
 LOW_ACCESS_LEVEL = 1
@@ -17,6 +26,79 @@ VALID_LEVELS = set(ROLE_MAP.keys())
 ADMIN_LEVEL = 0
 EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 MIN_PASSWORD_LEN = 8
+TOKEN_CACHE_MAX_ENTRIES = 1024
+THROTTLED_MESSAGE = "Muitas tentativas. Aguarde alguns instantes e tente novamente"
+BUSY_MESSAGE = "Servico sobrecarregado. Tente novamente em instantes"
+# comparacao NOCASE usa o indice unico de users.email; lower(email) forcava varredura da tabela
+USER_BY_EMAIL_SQL = "SELECT * FROM users WHERE email = ? COLLATE NOCASE"
+
+# tentativas por email e por IP antes de qualquer trabalho de bcrypt
+_login_email_limiter = per_minute("login_email", "LOGIN_EMAIL_RATE", burst=5, per_minute_rate=5)
+_login_ip_limiter = per_minute("login_ip", "LOGIN_IP_RATE", burst=20, per_minute_rate=30)
+_signup_ip_limiter = per_minute("signup_ip", "SIGNUP_IP_RATE", burst=3, per_minute_rate=1)
+
+# tokens ja verificados: sha256(token) -> claims; evita HMAC + validacao a cada rerun
+_token_cache: LRUCache = LRUCache(maxsize=TOKEN_CACHE_MAX_ENTRIES)
+_token_cache_lock = threading.Lock()
+
+
+@dataclass(slots=True)
+class ServiceResult:
+    """Resultado das operacoes do servico; to_dict() gera o formato JSON antigo."""
+
+    success: bool
+    message: Optional[str] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        result: dict[str, Any] = {"success": self.success}
+        if self.message is not None:
+            result["message"] = self.message
+        return result
+
+
+@dataclass(slots=True)
+class AuthResult(ServiceResult):
+    user: Optional[dict[str, Any]] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        result = ServiceResult.to_dict(self)
+        if self.user is not None:
+            result["user"] = self.user
+        return result
+
+
+@dataclass(slots=True)
+class LoginResult(ServiceResult):
+    token: Optional[str] = None
+    role: Optional[str] = None
+    user: Optional[dict[str, Any]] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        result = ServiceResult.to_dict(self)
+        if self.success:
+            result.update(token=self.token, role=self.role, user=self.user)
+        return result
+
+
+@dataclass(slots=True)
+class UserListResult(ServiceResult):
+    """Usuarios como linhas do SQLite (tuplas na ordem de columns)."""
+
+    columns: tuple[str, ...] = ()
+    rows: list[tuple] = field(default_factory=list)
+
+    def records(self) -> list[dict[str, Any]]:
+        """Linhas como dicts, com o perfil (role) derivado do nivel."""
+        records = [dict(zip(self.columns, row)) for row in self.rows]
+        for record in records:
+            record["role"] = ROLE_MAP.get(record.get("nivel"), "NORMAL")
+        return records
+
+    def to_dict(self) -> dict[str, Any]:
+        result = ServiceResult.to_dict(self)
+        if self.success:
+            result["data"] = self.records()
+        return result
 
 
 def _normalize_email(email: str) -> str:
@@ -62,9 +144,25 @@ def create_token(user: dict) -> str:
 
 
 def decode_token(token: str) -> Optional[dict[str, Any]]:
-    """Valida o token e retorna os dados ou None se invalido/expirado."""
+    """Valida o token e retorna os dados ou None se invalido/expirado.
+
+    Tokens validos ficam em cache (LRU) ate o exp, entao reruns seguidos
+    nao repetem a verificacao da assinatura.
+    """
+    if not token:
+        return None
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    with _token_cache_lock:
+        cached = _token_cache.get(digest)
+    if cached is not None:
+        if cached["exp"] > time.time():
+            return dict(cached)
+        with _token_cache_lock:
+            _token_cache.pop(digest, None)
+        return None
+
     try:
-        return jwt.decode(
+        data = jwt.decode(
             token,
             SECRET_KEY,
             algorithms=[ALGORITHM],
@@ -74,6 +172,10 @@ def decode_token(token: str) -> Optional[dict[str, Any]]:
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
         return None
 
+    with _token_cache_lock:
+        _token_cache[digest] = data
+    return dict(data)
+
 
 def log_error(action: str, message: str, details: str | None = None, token: str | None = None):
     try:
@@ -83,7 +185,7 @@ def log_error(action: str, message: str, details: str | None = None, token: str
             if data:
                 user_id = data.get("id")
 
-        with connection.get_connection() as conn:
+        with connection.pooled_connection() as conn:
             conn.execute(
                 """
                 INSERT INTO logs (user_id, action, message, details, created_at)
@@ -116,7 +218,7 @@ def audit_event(
 
         details_str = json.dumps(details, ensure_ascii=False) if details else None
 
-        with connection.get_connection() as conn:
+        with connection.pooled_connection() as conn:
             conn.execute(
                 """
                 INSERT INTO user_audit_logs (
@@ -138,36 +240,32 @@ def audit_event(
 
 
 def hash_password(password: str) -> str:
-    """Gera hash bcrypt da senha em texto simples."""
-    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
-    return hashed.decode("utf-8")
+    """Gera hash bcrypt da senha em texto simples (no pool de hash)."""
+    return _pool_hash_password(password)
 
 
 def verificar_password(password: str, hashed: str) -> bool:
-    """Confere senha em texto simples contra hash bcrypt."""
-    try:
-        return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
-    except Exception:
-        return False
+    """Confere senha em texto simples contra hash bcrypt (no pool de hash)."""
+    return check_password(password, hashed)
 
 
-def login(email: str, password: str):
+def login(email: str, password: str, client_ip: str | None = None) -> LoginResult:
     """Valida credenciais e retorna token JWT em caso de sucesso."""
     normalized_email = _normalize_email(email)
 
     if not normalized_email or not password:
-        return json.dumps({"success": False, "message": "Email ou senha invalidos"})
+        return LoginResult(False, "Email ou senha invalidos")
+
+    if not _login_ip_limiter.allow(client_ip) or not _login_email_limiter.allow(normalized_email):
+        return LoginResult(False, THROTTLED_MESSAGE)
 
     try:
-        with connection.get_connection() as conn:
-            user = conn.execute(
-                "SELECT * FROM users WHERE lower(email) = ?",
-                (normalized_email,),
-            ).fetchone()
+        with connection.pooled_connection() as conn:
+            user = conn.execute(USER_BY_EMAIL_SQL, (normalized_email,)).fetchone()
 
         # Nao revela se foi email ou senha
         if not user or not verificar_password(password, user["password"]):
-            return json.dumps({"success": False, "message": "Email ou senha invalidos"})
+            return LoginResult(False, "Email ou senha invalidos")
 
         role = ROLE_MAP.get(user["nivel"], "NORMAL")
         user_data = {
@@ -179,43 +277,44 @@ def login(email: str, password: str):
         }
 
         token = create_token(user_data)
-        return json.dumps({
-            "success": True,
-            "token": token,
-            "role": role,
-            "user": user_data,
-        })
+        _login_email_limiter.reset(normalized_email)
+        return LoginResult(True, token=token, role=role, user=user_data)
+    except HashingBusy:
+        return LoginResult(False, BUSY_MESSAGE)
     except Exception as exc:
         log_error(action="login", message="Erro ao realizar login", details=str(exc))
-        return json.dumps({"success": False, "message": "Erro interno ao realizar login"})
+        return LoginResult(False, "Erro interno ao realizar login")
 
 
-def require_auth(token: str, required_role: str | list[str] | set[str] | None = None):
+def check_auth(
+    token: str, required_role: str | list[str] | set[str] | None = None
+) -> AuthResult:
+    """Valida o token e, se informado, o perfil exigido."""
     data = decode_token(token)
 
     if not data:
-        return json.dumps({"success": False, "message": "Sessao expirada ou invalida"})
+        return AuthResult(False, "Sessao expirada ou invalida")
 
     if required_role:
         allowed_roles = {required_role} if isinstance(required_role, str) else set(required_role)
         if data.get("role") not in allowed_roles:
             roles_text = ", ".join(sorted(allowed_roles))
-            return json.dumps({"success": False, "message": f"Acesso negado: requer {roles_text}"})
+            return AuthResult(False, f"Acesso negado: requer {roles_text}")
 
-    return json.dumps({"success": True, "user": data})
+    return AuthResult(True, user=data)
 
 
-def criar_usuario(token: str, usuario: str, email: str, password: str, nivel: int, setor: str):
+def criar_usuario(token: str, usuario: str, email: str, password: str, nivel: int, setor: str) -> ServiceResult:
     """Cria um usuario novo apos validar permissao e integridade dos dados."""
-    auth = json.loads(require_auth(token, "ADMIN"))
-    if not auth.get("success"):
-        return json.dumps(auth)
+    auth = check_auth(token, "ADMIN")
+    if not auth.success:
+        return ServiceResult(False, auth.message)
 
     if nivel != LOW_ACCESS_LEVEL:
-        return json.dumps({
-            "success": False,
-            "message": "Novo usuario deve ser criado com nivel NORMAL (baixo acesso)",
-        })
+        return ServiceResult(
+            False,
+            "Novo usuario deve ser criado com nivel NORMAL (baixo acesso)",
+        )
 
     normalized_name = _normalize_text(usuario)
     normalized_email = _normalize_email(email)
@@ -229,21 +328,26 @@ def criar_usuario(token: str, usuario: str, email: str, password: str, nivel: in
         setor=normalized_setor,
     )
     if validation_error:
-        return json.dumps({"success": False, "message": validation_error})
+        return ServiceResult(False, validation_error)
 
     try:
-        with connection.get_connection() as conn:
+        with connection.pooled_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT 1 FROM users WHERE lower(email) = ?", (normalized_email,))
+            cursor.execute(
+                "SELECT 1 FROM users WHERE email = ? COLLATE NOCASE", (normalized_email,)
+            )
             if cursor.fetchone():
-                return json.dumps({"success": False, "message": "Usuario ja esta cadastrado"})
+                return ServiceResult(False, "Usuario ja esta cadastrado")
 
+        password_hash = hash_password(password)
+        with connection.pooled_connection() as conn:
+            cursor = conn.cursor()
             cursor.execute(
                 """
                 INSERT INTO users (usuario, email, password, nivel, setor)
                 VALUES (?, ?, ?, ?, ?)
                 """,
-                (normalized_name, normalized_email, hash_password(password), nivel, normalized_setor),
+                (normalized_name, normalized_email, password_hash, nivel, normalized_setor),
             )
             conn.commit()
             new_user_id = cursor.lastrowid
@@ -261,7 +365,11 @@ def criar_usuario(token: str, usuario: str, email: str, password: str, nivel: in
             token=token,
         )
 
-        return json.dumps({"success": True, "message": "Usuario criado com sucesso"})
+        return ServiceResult(True, "Usuario criado com sucesso")
+    except sqlite3.IntegrityError:
+        return ServiceResult(False, "Usuario ja esta cadastrado")
+    except HashingBusy:
+        return ServiceResult(False, BUSY_MESSAGE)
     except Exception as exc:
         log_error(
             action="criar_usuario",
@@ -269,10 +377,12 @@ def criar_usuario(token: str, usuario: str, email: str, password: str, nivel: in
             details=str(exc),
             token=token,
         )
-        return json.dumps({"success": False, "message": "Erro interno ao criar usuario"})
+        return ServiceResult(False, "Erro interno ao criar usuario")
 
 
-def cadastro_publico_usuario(usuario: str, email: str, password: str, setor: str):
+def cadastro_publico_usuario(
+    usuario: str, email: str, password: str, setor: str, client_ip: str | None = None
+) -> ServiceResult:
     """Permite auto-cadastro de usuario com nivel baixo (NORMAL)."""
     normalized_name = _normalize_text(usuario)
     normalized_email = _normalize_email(email)
@@ -286,15 +396,23 @@ def cadastro_publico_usuario(usuario: str, email: str, password: str, setor: str
         setor=normalized_setor,
     )
     if validation_error:
-        return json.dumps({"success": False, "message": validation_error})
+        return ServiceResult(False, validation_error)
+
+    if not _signup_ip_limiter.allow(client_ip):
+        return ServiceResult(False, THROTTLED_MESSAGE)
 
     try:
-        with connection.get_connection() as conn:
+        with connection.pooled_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT 1 FROM users WHERE lower(email) = ?", (normalized_email,))
+            cursor.execute(
+                "SELECT 1 FROM users WHERE email = ? COLLATE NOCASE", (normalized_email,)
+            )
             if cursor.fetchone():
-                return json.dumps({"success": False, "message": "Usuario ja esta cadastrado"})
+                return ServiceResult(False, "Usuario ja esta cadastrado")
 
+        password_hash = hash_password(password)
+        with connection.pooled_connection() as conn:
+            cursor = conn.cursor()
             cursor.execute(
                 """
                 INSERT INTO users (usuario, email, password, nivel, setor)
@@ -303,7 +421,7 @@ def cadastro_publico_usuario(usuario: str, email: str, password: str, setor: str
                 (
                     normalized_name,
                     normalized_email,
-                    hash_password(password),
+                    password_hash,
                     LOW_ACCESS_LEVEL,
                     normalized_setor,
                 ),
@@ -324,10 +442,14 @@ def cadastro_publico_usuario(usuario: str, email: str, password: str, setor: str
             token=None,
             user_id_admin=None,
         )
-        return json.dumps({
-            "success": True,
-            "message": "Conta criada com sucesso. Seu acesso inicial e NORMAL (baixo).",
-        })
+        return ServiceResult(
+            True,
+            "Conta criada com sucesso. Seu acesso inicial e NORMAL (baixo).",
+        )
+    except sqlite3.IntegrityError:
+        return ServiceResult(False, "Usuario ja esta cadastrado")
+    except HashingBusy:
+        return ServiceResult(False, BUSY_MESSAGE)
     except Exception as exc:
         log_error(
             action="cadastro_publico_usuario",
@@ -335,26 +457,26 @@ def cadastro_publico_usuario(usuario: str, email: str, password: str, setor: str
             details=str(exc),
             token=None,
         )
-        return json.dumps({"success": False, "message": "Erro interno ao criar conta"})
+        return ServiceResult(False, "Erro interno ao criar conta")
 
 
-def listar_usuarios(token: str):
+def listar_usuarios(token: str) -> UserListResult:
     """Retorna todos os usuarios cadastrados para o admin."""
-    auth = json.loads(require_auth(token, "ADMIN"))
-    if not auth.get("success"):
-        return json.dumps(auth)
+    auth = check_auth(token, "ADMIN")
+    if not auth.success:
+        return UserListResult(False, auth.message)
 
     try:
-        with connection.get_connection() as conn:
-            users = conn.execute(
+        with connection.pooled_connection() as conn:
+            cursor = conn.cursor()
+            # tuplas simples: vao direto para DataFrame.from_records sem virar dict
+            cursor.row_factory = None
+            rows = cursor.execute(
                 "SELECT id, usuario, email, setor, nivel, created_at, updated_at FROM users"
             ).fetchall()
+            columns = tuple(col[0] for col in cursor.description)
 
-        data = [dict(u) for u in users]
-        for user in data:
-            user["role"] = ROLE_MAP.get(user.get("nivel"), "NORMAL")
-
-        return json.dumps({"success": True, "data": data})
+        return UserListResult(True, columns=columns, rows=rows)
     except Exception as exc:
         log_error(
             action="listar_usuarios",
@@ -362,35 +484,35 @@ def listar_usuarios(token: str):
             details=str(exc),
             token=token,
         )
-        return json.dumps({"success": False, "message": "Erro interno ao buscar usuarios"})
+        return UserListResult(False, "Erro interno ao buscar usuarios")
 
 
-def alterar_nivel_acesso(token: str, target_user_id: int, novo_nivel: int):
+def alterar_nivel_acesso(token: str, target_user_id: int, novo_nivel: int) -> ServiceResult:
     """Altera o nivel de acesso de um usuario. Apenas ADMIN pode executar."""
-    auth = json.loads(require_auth(token, "ADMIN"))
-    if not auth.get("success"):
-        return json.dumps(auth)
+    auth = check_auth(token, "ADMIN")
+    if not auth.success:
+        return ServiceResult(False, auth.message)
 
     if target_user_id <= 0:
-        return json.dumps({"success": False, "message": "Usuario alvo invalido"})
+        return ServiceResult(False, "Usuario alvo invalido")
 
     if novo_nivel not in VALID_LEVELS:
-        return json.dumps({"success": False, "message": "Nivel de acesso invalido"})
+        return ServiceResult(False, "Nivel de acesso invalido")
 
-    actor_id = auth.get("user", {}).get("id")
+    actor_id = auth.user["id"]
 
     try:
-        with connection.get_connection() as conn:
+        with connection.pooled_connection() as conn:
             current = conn.execute(
                 "SELECT id, usuario, email, nivel FROM users WHERE id = ?",
                 (target_user_id,),
             ).fetchone()
             if not current:
-                return json.dumps({"success": False, "message": "Usuario nao encontrado"})
+                return ServiceResult(False, "Usuario nao encontrado")
 
             current_level = current["nivel"]
             if current_level == novo_nivel:
-                return json.dumps({"success": True, "message": "Nivel de acesso ja esta atualizado"})
+                return ServiceResult(True, "Nivel de acesso ja esta atualizado")
 
             if current_level == ADMIN_LEVEL and novo_nivel != ADMIN_LEVEL:
                 admin_count = conn.execute(
@@ -398,10 +520,10 @@ def alterar_nivel_acesso(token: str, target_user_id: int, novo_nivel: int):
                     (ADMIN_LEVEL,),
                 ).fetchone()[0]
                 if admin_count <= 1:
-                    return json.dumps({
-                        "success": False,
-                        "message": "Deve existir ao menos um administrador no sistema",
-                    })
+                    return ServiceResult(
+                        False,
+                        "Deve existir ao menos um administrador no sistema",
+                    )
 
             conn.execute(
                 "UPDATE users SET nivel = ? WHERE id = ?",
@@ -421,7 +543,7 @@ def alterar_nivel_acesso(token: str, target_user_id: int, novo_nivel: int):
             },
             token=token,
         )
-        return json.dumps({"success": True, "message": "Nivel de acesso atualizado com sucesso"})
+        return ServiceResult(True, "Nivel de acesso atualizado com sucesso")
     except Exception as exc:
         log_error(
             action="alterar_nivel_acesso",
@@ -429,7 +551,7 @@ def alterar_nivel_acesso(token: str, target_user_id: int, novo_nivel: int):
             details=str(exc),
             token=token,
         )
-        return json.dumps({"success": False, "message": "Erro interno ao alterar nivel de acesso"})
+        return ServiceResult(False, "Erro interno ao alterar nivel de acesso")
 
 
 def atualizar_usuario(
@@ -440,40 +562,44 @@ def atualizar_usuario(
     password: str | None = None,
     nivel: int | None = None,
     setor: str | None = None,
-):
+) -> ServiceResult:
     """Atualiza os dados de um usuario existente."""
-    auth = json.loads(require_auth(token, "ADMIN"))
-    if not auth.get("success"):
-        return json.dumps(auth)
+    auth = check_auth(token, "ADMIN")
+    if not auth.success:
+        return ServiceResult(False, auth.message)
 
     if target_user_id <= 0:
-        return json.dumps({"success": False, "message": "Usuario alvo invalido"})
+        return ServiceResult(False, "Usuario alvo invalido")
 
     if nivel is not None and nivel not in VALID_LEVELS:
-        return json.dumps({"success": False, "message": "Nivel de acesso invalido"})
+        return ServiceResult(False, "Nivel de acesso invalido")
 
     normalized_usuario = _normalize_text(usuario) if usuario is not None else None
     normalized_email = _normalize_email(email) if email is not None else None
     normalized_setor = _normalize_text(setor) if setor is not None else None
 
     if normalized_email is not None and normalized_email and not _is_valid_email(normalized_email):
-        return json.dumps({"success": False, "message": "Email invalido"})
+        return ServiceResult(False, "Email invalido")
 
     if password is not None and password.strip() and len(password.strip()) < MIN_PASSWORD_LEN:
-        return json.dumps({
-            "success": False,
-            "message": f"Senha deve ter ao menos {MIN_PASSWORD_LEN} caracteres",
-        })
+        return ServiceResult(
+            False,
+            f"Senha deve ter ao menos {MIN_PASSWORD_LEN} caracteres",
+        )
 
     try:
-        with connection.get_connection() as conn:
+        # bcrypt fora da conexao: o hash nao segura o banco
+        password_hash = (
+            hash_password(password) if password is not None and password.strip() != "" else None
+        )
+        with connection.pooled_connection() as conn:
             cursor = conn.cursor()
             current_user = conn.execute(
                 "SELECT id, usuario, email, nivel, setor FROM users WHERE id = ?",
                 (target_user_id,),
             ).fetchone()
             if not current_user:
-                return json.dumps({"success": False, "message": "Usuario nao encontrado"})
+                return ServiceResult(False, "Usuario nao encontrado")
 
             if nivel is not None and current_user["nivel"] == ADMIN_LEVEL and nivel != ADMIN_LEVEL:
                 admin_count = conn.execute(
@@ -481,18 +607,18 @@ def atualizar_usuario(
                     (ADMIN_LEVEL,),
                 ).fetchone()[0]
                 if admin_count <= 1:
-                    return json.dumps({
-                        "success": False,
-                        "message": "Deve existir ao menos um administrador no sistema",
-                    })
+                    return ServiceResult(
+                        False,
+                        "Deve existir ao menos um administrador no sistema",
+                    )
 
             if normalized_email:
                 existing_email = conn.execute(
-                    "SELECT id FROM users WHERE lower(email) = ? AND id <> ?",
+                    "SELECT id FROM users WHERE email = ? COLLATE NOCASE AND id <> ?",
                     (normalized_email, target_user_id),
                 ).fetchone()
                 if existing_email:
-                    return json.dumps({"success": False, "message": "Email ja cadastrado"})
+                    return ServiceResult(False, "Email ja cadastrado")
 
             set_clauses = []
             values = []
@@ -510,12 +636,12 @@ def atualizar_usuario(
             add_if_present("nivel", nivel)
             add_if_present("setor", normalized_setor)
 
-            if password is not None and password.strip() != "":
+            if password_hash is not None:
                 set_clauses.append("password = ?")
-                values.append(hash_password(password))
+                values.append(password_hash)
 
             if not set_clauses:
-                return json.dumps({"success": False, "message": "Nenhum campo para atualizar"})
+                return ServiceResult(False, "Nenhum campo para atualizar")
 
             changed_fields = [c.split(" = ")[0] for c in set_clauses]
             old_data = dict(current_user)
@@ -548,7 +674,9 @@ def atualizar_usuario(
             },
             token=token,
         )
-        return json.dumps({"success": True, "message": "Usuario atualizado com sucesso"})
+        return ServiceResult(True, "Usuario atualizado com sucesso")
+    except HashingBusy:
+        return ServiceResult(False, BUSY_MESSAGE)
     except Exception as exc:
         log_error(
             action="atualizar_usuario",
@@ -556,44 +684,44 @@ def atualizar_usuario(
             details=str(exc),
             token=token,
         )
-        return json.dumps({"success": False, "message": "Erro interno ao atualizar usuario"})
+        return ServiceResult(False, "Erro interno ao atualizar usuario")
 
 
-def deletar_usuario(token: str, target_user_id: int):
+def deletar_usuario(token: str, target_user_id: int) -> ServiceResult:
     """Deleta usuario existente garantindo regras minimas de seguranca."""
-    auth = json.loads(require_auth(token, "ADMIN"))
-    if not auth.get("success"):
-        return json.dumps(auth)
+    auth = check_auth(token, "ADMIN")
+    if not auth.success:
+        return ServiceResult(False, auth.message)
 
-    actor_id = auth.get("user", {}).get("id")
+    actor_id = auth.user["id"]
     if actor_id == target_user_id:
-        return json.dumps({"success": False, "message": "Nao e permitido remover o proprio usuario logado"})
+        return ServiceResult(False, "Nao e permitido remover o proprio usuario logado")
 
     try:
-        with connection.get_connection() as conn:
+        with connection.pooled_connection() as conn:
             total_users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
             if total_users <= 1:
-                return json.dumps({
-                    "success": False,
-                    "message": "Deve existir ao menos um usuario no sistema",
-                })
+                return ServiceResult(
+                    False,
+                    "Deve existir ao menos um usuario no sistema",
+                )
 
             user_role = conn.execute(
                 "SELECT nivel FROM users WHERE id = ?",
                 (target_user_id,),
             ).fetchone()
             if not user_role:
-                return json.dumps({"success": False, "message": "Usuario nao encontrado"})
+                return ServiceResult(False, "Usuario nao encontrado")
 
             if user_role["nivel"] == 0:
                 admin_count = conn.execute(
                     "SELECT COUNT(*) FROM users WHERE nivel = 0"
                 ).fetchone()[0]
                 if admin_count <= 1:
-                    return json.dumps({
-                        "success": False,
-                        "message": "Deve existir ao menos um administrador no sistema",
-                    })
+                    return ServiceResult(
+                        False,
+                        "Deve existir ao menos um administrador no sistema",
+                    )
 
             conn.execute("DELETE FROM users WHERE id = ?", (target_user_id,))
             conn.commit()
@@ -604,7 +732,7 @@ def deletar_usuario(token: str, target_user_id: int):
             details=None,
             token=token,
         )
-        return json.dumps({"success": True, "message": "Usuario deletado com sucesso"})
+        return ServiceResult(True, "Usuario deletado com sucesso")
     except Exception as exc:
         log_error(
             action="deletar_usuario",
@@ -612,4 +740,4 @@ def deletar_usuario(token: str, target_user_id: int):
             details=str(exc),
             token=token,
         )
-        return json.dumps({"success": False, "message": "Erro interno ao deletar usuario"})
+        return ServiceResult(False, "Erro interno ao deletar usuario")
@@ -28,7 +28,7 @@ def get_user_info(user_id):
         return None
         
     cursor = conn.cursor()
-    cursor.execute("SELECT id, nome, email, setor FROM users WHERE id = ?", (user_id,))
+    cursor.execute("SELECT id, usuario AS nome, email, setor FROM users WHERE id = ?", (user_id,))
     user = cursor.fetchone()
     conn.close()
    
@@ -56,7 +56,7 @@ def get_all_users():
         return []
         
     cursor = conn.cursor()
-    cursor.execute("SELECT id, nome, email, setor FROM users")
+    cursor.execute("SELECT id, usuario AS nome, email, setor FROM users")
     users = cursor.fetchall()
     conn.close()
    
@@ -77,7 +77,7 @@ def get_users_name_sector_email():
         return []
 
     cursor = conn.cursor()
-    cursor.execute("SELECT nome, setor, email FROM users")
+    cursor.execute("SELECT usuario AS nome, setor, email FROM users")
     users = cursor.fetchall()
     conn.close()
 
@@ -92,21 +92,27 @@ def get_users_name_sector_email():
 def get_users_by_sector_ranking():
     """
     Retorna ranking dos setores com mais usuários.
+    A contagem é feita no banco (GROUP BY), sem carregar os usuários.
    
     Returns:
         Lista de dicts com 'setor', 'total_usuarios' e 'ranking'
     """
-    users = get_users_name_sector_email()
-    if not users:
+    conn = get_connection()
+    if not conn:
         return []
 
-    sector_counts = {}
-    for user in users:
-        setor = user.get("setor")
-        if setor:
-            sector_counts[setor] = sector_counts.get(setor, 0) + 1
-
-    sectors = sorted(sector_counts.items(), key=lambda item: item[1], reverse=True)
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT setor, COUNT(*) AS total_usuarios
+        FROM users
+        WHERE setor IS NOT NULL AND setor <> ''
+        GROUP BY setor
+        ORDER BY total_usuarios DESC, setor
+        """
+    )
+    sectors = cursor.fetchall()
+    conn.close()
 
     return [
         {
@@ -118,6 +124,21 @@ def get_users_by_sector_ranking():
     ]
 
 
+def count_users():
+    """
+    Retorna o total de usuários cadastrados (COUNT no banco).
+    """
+    conn = get_connection()
+    if not conn:
+        return 0
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM users")
+    total = cursor.fetchone()[0]
+    conn.close()
+    return total
+
+
 
 
 def show_sector_users_table():
@@ -147,8 +168,7 @@ def show_total_users_table():
     """
     Exibe tabela com o total de usuarios.
     """
-    users = get_users_name_sector_email()
-    total_users = len(users)
+    total_users = count_users()
 
     print("=" * 40)
     print("TOTAL DE USUARIOS")
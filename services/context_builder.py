@@ -0,0 +1,135 @@
+"""Montagem do contexto do prompt sob um orcamento de tokens.
+
+Os chunks chegam ordenados por relevancia e entram gulosamente enquanto
+couberem em CONTEXT_TOKEN_BUDGET. Repetidos (inclusive de outra colecao)
+sao descartados, e chunks vizinhos do mesmo arquivo (chunk_index seguido)
+sao unidos sem repetir os ~100 caracteres de chunk_overlap.
+"""
+
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+
+from utils.debug import incr, log
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+# sobreposicao maxima procurada entre vizinhos (chunk_overlap do splitter e 100)
+_MAX_OVERLAP_CHARS = 200
+_CHARS_PER_TOKEN = 4
+_EMPTY_CONTEXT = "Nenhum documento especifico encontrado no banco de dados."
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as exc:
+        log(f"context_builder: tiktoken unavailable, using char estimate ({exc})")
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa local de tokens (tiktoken se disponivel, senao ~4 caracteres por token)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // _CHARS_PER_TOKEN + 1
+
+
+def _strip_overlap(previous: str, following: str) -> str:
+    """Remove do inicio de following o trecho que ja termina previous."""
+    limit = min(len(previous), len(following), _MAX_OVERLAP_CHARS)
+    for size in range(limit, 0, -1):
+        if previous.endswith(following[:size]):
+            return following[size:].lstrip()
+    return following
+
+
+def _chunk_position(doc):
+    metadata = doc.metadata or {}
+    try:
+        return metadata.get("source"), int(metadata["chunk_index"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _select(docs, budget: int) -> list:
+    """Escolhe, em ordem de relevancia, os chunks unicos que cabem no orcamento."""
+    selected, texts, used = [], [], 0
+    for doc in docs:
+        text = (doc.page_content or "").strip()
+        if not text or any(text in kept for kept in texts):
+            continue
+        cost = estimate_tokens(text)
+        if used + cost > budget:
+            continue
+        selected.append(doc)
+        texts.append(text)
+        used += cost
+    return selected
+
+
+def _merge_adjacent(selected) -> list[tuple[str, str]]:
+    """
+    Agrupa chunks vizinhos do mesmo arquivo num unico bloco.
+    Retorna (source, texto) na ordem de relevancia do primeiro chunk de cada bloco.
+    """
+    positions = {id(doc): _chunk_position(doc) for doc in selected}
+    by_position: dict = {}
+    for doc in selected:
+        if positions[id(doc)] is not None:
+            by_position.setdefault(positions[id(doc)], doc)
+
+    blocks, consumed = [], set()
+    for doc in selected:
+        if id(doc) in consumed:
+            continue
+        position = positions[id(doc)]
+        source = (doc.metadata or {}).get("source", "Desconhecido")
+        if position is None or by_position[position] is not doc:
+            # sem chunk_index, ou mesma posicao vinda de outra colecao: bloco proprio
+            consumed.add(id(doc))
+            blocks.append((source, doc.page_content.strip()))
+            continue
+
+        first = position[1]
+        while (position[0], first - 1) in by_position:
+            first -= 1
+        text, index = "", first
+        while (position[0], index) in by_position:
+            chunk = by_position[(position[0], index)]
+            consumed.add(id(chunk))
+            chunk_text = chunk.page_content.strip()
+            text = f"{text}\n{_strip_overlap(text, chunk_text)}" if text else chunk_text
+            index += 1
+        blocks.append((source, text))
+    return blocks
+
+
+def build_context(docs, token_budget: int | None = None) -> tuple[str, str, int]:
+    """
+    Monta o contexto do prompt a partir dos docs (mais relevantes primeiro).
+    Retorna (contexto, nota_de_fontes, tokens_estimados_do_contexto).
+    """
+    budget = CONTEXT_TOKEN_BUDGET if token_budget is None else int(token_budget)
+    selected = _select(docs or [], budget)
+    if not selected:
+        return _EMPTY_CONTEXT, "", estimate_tokens(_EMPTY_CONTEXT)
+
+    blocks = _merge_adjacent(selected)
+    context_text = "\n\n".join(text for _, text in blocks)
+    sources = sorted({source for source, _ in blocks})
+    source_note = f"\n\n(Fontes utilizadas: {', '.join(sources)})" if sources else ""
+
+    tokens = estimate_tokens(context_text)
+    incr("llm.context_tokens", tokens)
+    log(
+        f"context_builder: {len(selected)}/{len(docs)} chunks in {len(blocks)} blocks, "
+        f"~{tokens}/{budget} tokens"
+    )
+    return context_text, source_note, tokens
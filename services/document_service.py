@@ -1,80 +1,565 @@
+import codecs
+import csv
+import io
+import itertools
 import os
 import json
+import multiprocessing
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Callable, Iterator, Optional
 from pypdf import PdfReader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 import pandas as pd
 
-def _split_text(text: str):
-    text_splitter = RecursiveCharacterTextSplitter(
+# Recebe (fracao concluida entre 0 e 1, mensagem curta de status)
+ProgressCallback = Callable[[float, str], None]
+
+INGEST_BATCH_CHUNKS = int(os.getenv("INGEST_BATCH_CHUNKS", "64"))
+# extracao paralela e opcional: cada worker e um processo novo (spawn), que
+# reimporta este modulo; so compensa em PDFs grandes
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "1"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+CSV_READ_ROWS = int(os.getenv("CSV_READ_ROWS", "5000"))
+CSV_CHUNK_CHARS = int(os.getenv("CSV_CHUNK_CHARS", "1000"))
+JSON_CHUNK_CHARS = int(os.getenv("JSON_CHUNK_CHARS", "1000"))
+JSON_READ_CHARS = 64 * 1024
+JSON_MAX_READ_CHARS = 16 * 1024 * 1024
+# maior registro JSON aceito; acima disso o arquivo e recusado em vez de crescer o buffer
+JSON_MAX_RECORD_CHARS = int(os.getenv("JSON_MAX_RECORD_CHARS", str(64 * 1024 * 1024)))
+# erro de JSON a menos disto do fim do buffer pode ser so um registro cortado (ex.: "tru", "\u00")
+_JSON_TRUNCATION_SLACK = 8
+# fallback de texto sem quebras de linha: carrega no maximo um chunk entre leituras
+_TEXT_CARRY_CHARS = 1000
+_JSON_WS = " \t\r\n"
+_JSON_KEY_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# PdfReader aberto uma vez por processo do pool de extracao
+_worker_reader = None
+
+
+@lru_cache(maxsize=1)
+def _get_text_splitter():
+    return RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=100,
         separators=["\n\n", "\n", ". ", " ", ""]
     )
-    return text_splitter.split_text(text)
-
-
-def _save_chunks(chunks, filename: str, collection_name: str):
-    if not chunks:
-        return {"status": "error", "message": "Não foi possível dividir o texto em chunks."}
-    metadatas = [{"source": filename, "chunk_index": i} for i in range(len(chunks))]
-    from database.vector_store import add_documents_to_db
-    success = add_documents_to_db(chunks, metadatas, collection_name=collection_name)
-    if success:
-        return {
-            "status": "success",
-            "message": "Processado com Sucesso!",
-            "details": f"Arquivo '{filename}' gerou {len(chunks)} fragmentos de conhecimento."
-        }
-    return {"status": "error", "message": "Falha ao salvar no banco de dados."}
 
 
-def process_uploaded_file(uploaded_file, collection_name: str = "corporate_docs"):
+def _split_text(text: str):
+    return _get_text_splitter().split_text(text)
+
+
+def _report(on_progress: Optional[ProgressCallback], fraction: float, message: str):
+    if on_progress is None:
+        return
+    try:
+        on_progress(min(1.0, max(0.0, fraction)), message)
+    except Exception:
+        # progresso nunca pode derrubar a ingestao
+        pass
+
+
+def _batched(records: Iterator[tuple[str, dict]], size: int = INGEST_BATCH_CHUNKS):
+    """Agrupa (texto, metadata) em lotes (textos, metadatas) de tamanho limitado."""
+    texts, metadatas = [], []
+    for text, metadata in records:
+        texts.append(text)
+        metadatas.append(metadata)
+        if len(texts) >= size:
+            yield texts, metadatas
+            texts, metadatas = [], []
+    if texts:
+        yield texts, metadatas
+
+
+def _init_pdf_worker(pdf_bytes: bytes):
+    global _worker_reader
+    _worker_reader = PdfReader(io.BytesIO(pdf_bytes))
+
+
+def _extract_page_range(start: int, end: int) -> list[str]:
+    return [_worker_reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _iter_page_texts_parallel(pdf_bytes: bytes, total_pages: int, workers: int):
+    """Distribui faixas de paginas entre processos e devolve os textos em ordem."""
+    ranges = [
+        (start, min(total_pages, start + PDF_PAGES_PER_TASK))
+        for start in range(0, total_pages, max(1, PDF_PAGES_PER_TASK))
+    ]
+    # spawn, nao fork: o processo do Streamlit tem threads (torch, pools de ingestao)
+    # e um fork pode herdar um lock travado por outra thread e travar o filho
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_pdf_worker,
+        initargs=(pdf_bytes,),
+    ) as executor:
+        # janela limitada de tarefas em voo para nao acumular texto na memoria
+        pending = deque()
+        remaining = iter(ranges)
+
+        def _submit_next():
+            page_range = next(remaining, None)
+            if page_range is not None:
+                pending.append(executor.submit(_extract_page_range, *page_range))
+
+        for _ in range(workers * 2):
+            _submit_next()
+        while pending:
+            texts = pending.popleft().result()
+            _submit_next()
+            yield from texts
+
+
+def _iter_page_texts(pdf_bytes: bytes):
+    pdf_reader = PdfReader(io.BytesIO(pdf_bytes))
+    total_pages = len(pdf_reader.pages)
+    workers = min(PDF_EXTRACT_WORKERS, total_pages)
+    if workers > 1 and total_pages >= PDF_PARALLEL_MIN_PAGES:
+        return total_pages, _iter_page_texts_parallel(pdf_bytes, total_pages, workers)
+    return total_pages, (page.extract_text() or "" for page in pdf_reader.pages)
+
+
+def _iter_pdf_chunks(
+    page_texts,
+    total_pages: int,
+    filename: str,
+    on_progress: Optional[ProgressCallback] = None,
+):
+    """Divide uma pagina por vez, sem montar o texto completo do PDF."""
+    total_pages = total_pages or 1
+    chunk_index = 0
+    for page_number, page_text in enumerate(page_texts, start=1):
+        if page_text.strip():
+            for chunk in _split_text(page_text):
+                yield chunk, {"source": filename, "chunk_index": chunk_index, "page": page_number}
+                chunk_index += 1
+        _report(on_progress, page_number / total_pages, f"Pagina {page_number}/{total_pages}")
+
+
+class DocumentParseError(ValueError):
+    """Arquivo invalido detectado durante a leitura em fluxo."""
+
+
+def _save_chunk_stream(records, filename: str, collection_name: str, empty_message: str, owner=None):
+    """
+    Grava (texto, metadata) em lotes a medida que sao produzidos. owner (quem
+    enviou) separa arquivos de mesmo nome de donos diferentes na colecao.
+    """
+    total = 0
+    submitted = 0
+    parse_error: Optional[Exception] = None
+
+    def _counted():
+        nonlocal total, parse_error
+        try:
+            for record in records:
+                total += 1
+                yield record
+        except Exception as exc:
+            # interrompe a gravacao, mas o erro e do arquivo, nao do banco
+            parse_error = exc
+            raise DocumentParseError(str(exc)) from exc
+
+    def _submitted():
+        # cada lote e gravado antes do proximo ser pedido: os ja entregues estao no banco
+        nonlocal submitted
+        for texts, metadatas in _batched(_counted()):
+            yield texts, metadatas
+            submitted += len(texts)
+
+    from database.vector_store import add_document_batches
+    success = add_document_batches(
+        _submitted(), filename, collection_name=collection_name, owner=owner
+    )
+    if parse_error is not None:
+        message = f"Arquivo invalido: {parse_error}."
+        if submitted:
+            message += (
+                f" A leitura parou depois de {submitted} fragmentos ja gravados:"
+                " o arquivo foi ingerido parcialmente. Corrija-o e envie novamente."
+            )
+        return {"status": "error", "message": message}
+    if not total:
+        return {"status": "error", "message": empty_message}
+    if not success:
+        return {"status": "error", "message": "Falha ao salvar no banco de dados."}
+    return {
+        "status": "success",
+        "message": "Processado com Sucesso!",
+        "details": f"Arquivo '{filename}' gerou {total} fragmentos de conhecimento."
+    }
+
+
+def process_uploaded_file(
+    uploaded_file,
+    collection_name: str = "corporate_docs",
+    on_progress: Optional[ProgressCallback] = None,
+    owner=None,
+):
     '''
     Lê um arquivo em PDF (Upload do Streamlit), extrai o texto e salva no banco.
+    As paginas sao processadas em fluxo (pagina -> chunks -> lotes -> Chroma);
+    PDFs grandes tem a extracao distribuida entre processos.
     '''
     try:
-        pdf_reader = PdfReader(uploaded_file)
-        text = ""
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-        if not text.strip():
-            return {"status": "error", "message": "O PDF parece estar vazio ou é uma imagem (sem texto selecionável)."}
-        chunks = _split_text(text)
+        uploaded_file.seek(0)
+        pdf_bytes = uploaded_file.read()
         filename = uploaded_file.name
-        return _save_chunks(chunks, filename, collection_name)
+        total_pages, page_texts = _iter_page_texts(pdf_bytes)
+        return _save_chunk_stream(
+            _iter_pdf_chunks(page_texts, total_pages, filename, on_progress),
+            filename,
+            collection_name,
+            "O PDF parece estar vazio ou é uma imagem (sem texto selecionável).",
+            owner=owner,
+        )
     except Exception as e:
         return {"status": "error", "message": f"Erro interno ao processar PDF: {str(e)}"}
 
 
-def process_uploaded_csv(uploaded_file, collection_name: str = "corporate_docs"):
+def _csv_line(values) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow(values)
+    return buffer.getvalue()
+
+
+def _iter_csv_chunks(
+    frames,
+    filename: str,
+    total_bytes: int = 0,
+    tell: Optional[Callable[[], int]] = None,
+    on_progress: Optional[ProgressCallback] = None,
+):
+    """Monta chunks de linhas inteiras, repetindo o cabecalho em cada um."""
+    chunk_index = 0
+    header = ""
+    lines: list[str] = []
+    size = 0
+    row_start = row = 0
+
+    def _record():
+        text = "\n".join([header, *lines])
+        metadata = {
+            "source": filename,
+            "chunk_index": chunk_index,
+            "row_start": row_start,
+            "row_end": row - 1,
+        }
+        return text, metadata
+
+    for frame in frames:
+        if not header:
+            header = _csv_line(frame.columns)
+        for values in frame.itertuples(index=False, name=None):
+            line = _csv_line(values)
+            if lines and size + len(line) + 1 > CSV_CHUNK_CHARS:
+                yield _record()
+                chunk_index += 1
+                lines, row_start = [], row
+            if not lines:
+                size = len(header)
+            lines.append(line)
+            size += len(line) + 1
+            row += 1
+        if total_bytes and tell is not None:
+            _report(on_progress, tell() / total_bytes, f"{row} linhas lidas")
+
+    if lines:
+        yield _record()
+    _report(on_progress, 1.0, f"{row} linhas lidas")
+
+
+def process_uploaded_csv(
+    uploaded_file,
+    collection_name: str = "corporate_docs",
+    on_progress: Optional[ProgressCallback] = None,
+    owner=None,
+):
+    '''
+    Le o CSV em blocos de linhas (memoria limitada) e gera chunks de linhas
+    inteiras com o cabecalho repetido e metadata row_start/row_end.
+    '''
     try:
         uploaded_file.seek(0)
-        df = pd.read_csv(uploaded_file)
-        text = df.to_csv(index=False)
-        chunks = _split_text(text)
         filename = uploaded_file.name
-        return _save_chunks(chunks, filename, collection_name)
+        frames = pd.read_csv(
+            uploaded_file,
+            chunksize=max(1, CSV_READ_ROWS),
+            dtype=str,
+            keep_default_na=False,
+        )
+        return _save_chunk_stream(
+            _iter_csv_chunks(
+                frames,
+                filename,
+                total_bytes=getattr(uploaded_file, "size", 0) or 0,
+                tell=uploaded_file.tell,
+                on_progress=on_progress,
+            ),
+            filename,
+            collection_name,
+            "O CSV nao possui linhas de dados.",
+            owner=owner,
+        )
     except Exception as e:
         return {"status": "error", "message": f"Erro ao processar CSV: {str(e)}"}
 
 
-def process_uploaded_json(uploaded_file, collection_name: str = "corporate_docs"):
+def _detect_encoding(uploaded_file) -> str:
+    sample = uploaded_file.read(JSON_READ_CHARS)
+    uploaded_file.seek(0)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def _iter_json_values(text_stream):
+    """
+    Le um array JSON de topo ou JSON Lines um valor por vez, sem carregar o
+    arquivo inteiro. Gera (item_de_array, valor).
+
+    Para no primeiro erro de sintaxe (ValueError): so continua lendo quando o
+    erro esta no fim do buffer, ou seja, quando o registro apenas nao chegou
+    inteiro, e nunca alem de JSON_MAX_RECORD_CHARS por registro.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    read_size = JSON_READ_CHARS
+
+    def _fill() -> bool:
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        data = text_stream.read(read_size)
+        if not data:
+            eof = True
+            return False
+        buffer = buffer[pos:] + data
+        pos = 0
+        return True
+
+    def _peek(skip: str):
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in skip:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not _fill():
+                return None
+
+    def _maybe_truncated(exc: json.JSONDecodeError) -> bool:
+        return exc.pos >= len(buffer) - _JSON_TRUNCATION_SLACK or exc.msg.startswith(
+            "Unterminated string"
+        )
+
+    first = _peek(_JSON_WS)
+    in_array = first == "["
+    if in_array:
+        pos += 1
+
+    count = 0
+    while True:
+        next_char = _peek(_JSON_WS)
+        if in_array:
+            if next_char is None:
+                raise ValueError("Array JSON nao foi fechado.")
+            if next_char == "]":
+                return
+            if count:
+                # entre itens e obrigatoria exatamente uma virgula seguida de um valor
+                if next_char != ",":
+                    raise ValueError(f"Esperado ',' ou ']' apos o item {count} do array JSON.")
+                pos += 1
+                next_char = _peek(_JSON_WS)
+                if next_char is None:
+                    raise ValueError("Array JSON nao foi fechado.")
+            if next_char in ",]":
+                raise ValueError(f"Item vazio no array JSON apos o item {count}.")
+        elif next_char is None:
+            return
+
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as exc:
+                if not _maybe_truncated(exc):
+                    raise
+                if len(buffer) - pos > JSON_MAX_RECORD_CHARS:
+                    raise ValueError(
+                        f"Registro JSON maior que o limite de {JSON_MAX_RECORD_CHARS} caracteres."
+                    ) from exc
+                # registro incompleto no buffer: le mais (em blocos crescentes)
+                read_size = min(read_size * 2, JSON_MAX_READ_CHARS)
+                if not _fill():
+                    raise
+                continue
+            # numero/literal no fim do buffer pode estar truncado
+            if end == len(buffer) and _fill():
+                continue
+            break
+
+        pos = end
+        read_size = JSON_READ_CHARS
+        count += 1
+        yield in_array, value
+
+
+def _iter_json_records(first, values):
+    """
+    Gera (json_path, valor) a partir do primeiro valor ja lido e dos seguintes;
+    JSON Lines vira um array implicito ($[i] = linha i).
+    """
+    second = next(values, None)
+    if second is None and not first[0]:
+        yield "$", first[1]
+        return
+    head = [first] if second is None else [first, second]
+    for index, (_, value) in enumerate(itertools.chain(head, values)):
+        yield f"$[{index}]", value
+
+
+def _json_child_path(path: str, key) -> str:
+    if _JSON_KEY_RE.match(str(key)):
+        return f"{path}.{key}"
+    return f"{path}[{json.dumps(str(key), ensure_ascii=False)}]"
+
+
+def _iter_json_pieces(path: str, value, nested: bool = False):
+    """Serializa de forma compacta; subarvores grandes sao divididas por caminho."""
+    text = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    if nested:
+        text = f"{path}: {text}"
+    if len(text) <= JSON_CHUNK_CHARS:
+        yield path, text
+    elif isinstance(value, dict) and value:
+        for key, child in value.items():
+            yield from _iter_json_pieces(_json_child_path(path, key), child, nested=True)
+    elif isinstance(value, list) and value:
+        for index, child in enumerate(value):
+            yield from _iter_json_pieces(f"{path}[{index}]", child, nested=True)
+    else:
+        for piece in _split_text(text):
+            yield path, piece
+
+
+def _iter_json_chunks(
+    records,
+    filename: str,
+    total_bytes: int = 0,
+    tell: Optional[Callable[[], int]] = None,
+    on_progress: Optional[ProgressCallback] = None,
+):
+    """Agrupa pecas pequenas consecutivas em chunks de ate JSON_CHUNK_CHARS."""
+    chunk_index = 0
+    lines: list[str] = []
+    paths: list[str] = []
+    size = 0
+    count = 0
+
+    def _record():
+        metadata = {
+            "source": filename,
+            "chunk_index": chunk_index,
+            "json_path": paths[0],
+            "json_path_end": paths[-1],
+        }
+        return "\n".join(lines), metadata
+
+    for path, value in records:
+        for piece_path, piece in _iter_json_pieces(path, value):
+            if lines and size + len(piece) + 1 > JSON_CHUNK_CHARS:
+                yield _record()
+                chunk_index += 1
+                lines, paths, size = [], [], 0
+            lines.append(piece)
+            paths.append(piece_path)
+            size += len(piece) + 1
+        count += 1
+        if total_bytes and tell is not None and count % 100 == 0:
+            _report(on_progress, tell() / total_bytes, f"{count} registros lidos")
+
+    if lines:
+        yield _record()
+    _report(on_progress, 1.0, f"{count} registros lidos")
+
+
+def _iter_plain_text_chunks(text_stream, filename: str):
+    """Fallback para arquivos .json que nao sao JSON valido: divide o texto bruto."""
+    chunk_index = 0
+    carry = ""
+    while True:
+        block = text_stream.read(JSON_READ_CHARS)
+        text = carry + block
+        if block:
+            cut = text.rfind("\n")
+            if cut <= 0:
+                # sem quebra de linha: corta perto do fim (num espaco, se houver) para
+                # nao recopiar um carry cada vez maior a cada leitura
+                if len(text) <= _TEXT_CARRY_CHARS:
+                    carry = text
+                    continue
+                limit = len(text) - _TEXT_CARRY_CHARS
+                cut = text.rfind(" ", limit)
+                if cut < limit:
+                    cut = limit
+            text, carry = text[:cut], text[cut + 1:] if text[cut].isspace() else text[cut:]
+        for chunk in _split_text(text):
+            yield chunk, {"source": filename, "chunk_index": chunk_index}
+            chunk_index += 1
+        if not block:
+            return
+
+
+def process_uploaded_json(
+    uploaded_file,
+    collection_name: str = "corporate_docs",
+    on_progress: Optional[ProgressCallback] = None,
+    owner=None,
+):
+    '''
+    Le arrays JSON e JSON Lines registro a registro, sem pretty-print, e
+    gera chunks por registro/subarvore com metadata json_path.
+    '''
     try:
         uploaded_file.seek(0)
-        raw = uploaded_file.read()
-        try:
-            text = raw.decode("utf-8")
-        except Exception:
-            text = raw.decode("latin-1", errors="ignore")
-        try:
-            parsed = json.loads(text)
-            text = json.dumps(parsed, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
-        chunks = _split_text(text)
         filename = uploaded_file.name
-        return _save_chunks(chunks, filename, collection_name)
+        encoding = _detect_encoding(uploaded_file)
+        text_stream = io.TextIOWrapper(uploaded_file, encoding=encoding, errors="replace")
+        try:
+            values = _iter_json_values(text_stream)
+            try:
+                first = next(values, None)
+            except ValueError:
+                # so o primeiro valor decide se e JSON; erros depois dele sao
+                # JSON invalido e falham o job com DocumentParseError
+                text_stream.seek(0)
+                chunks = _iter_plain_text_chunks(text_stream, filename)
+            else:
+                records = _iter_json_records(first, values) if first is not None else iter(())
+                chunks = _iter_json_chunks(
+                    records,
+                    filename,
+                    total_bytes=getattr(uploaded_file, "size", 0) or 0,
+                    tell=uploaded_file.tell,
+                    on_progress=on_progress,
+                )
+            return _save_chunk_stream(
+                chunks, filename, collection_name, "O JSON esta vazio.", owner=owner
+            )
+        finally:
+            # devolve o arquivo do upload sem fecha-lo
+            text_stream.detach()
     except Exception as e:
         return {"status": "error", "message": f"Erro ao processar JSON: {str(e)}"}
@@ -0,0 +1,88 @@
+"""Hash e verificacao de senhas bcrypt num pool de threads limitado.
+
+bcrypt libera o GIL, entao cada chamada ocupa um nucleo por ~250ms. O pool
+tem HASH_WORKERS threads e aceita no maximo HASH_QUEUE_MAX pedidos
+esperando; acima disso a chamada falha na hora com HashingBusy em vez de
+empilhar trabalho e atrasar todos os logins.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import bcrypt
+
+from utils.debug import incr, log
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_MAX = int(os.getenv("HASH_QUEUE_MAX", "32"))
+HASH_TIMEOUT_SECONDS = float(os.getenv("HASH_TIMEOUT_SECONDS", "10"))
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+# vagas = executando + esperando; sem vaga, o pedido e recusado
+_slots = threading.BoundedSemaphore(max(1, HASH_WORKERS) + max(0, HASH_QUEUE_MAX))
+
+
+class HashingBusy(RuntimeError):
+    """Pool de hash cheio ou resposta demorou mais que HASH_TIMEOUT_SECONDS."""
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, HASH_WORKERS),
+                thread_name_prefix="bcrypt",
+            )
+        return _executor
+
+
+def _run(func, *args):
+    if not _slots.acquire(blocking=False):
+        incr("auth.hash_rejected")
+        log("hashing: pool full, request rejected")
+        raise HashingBusy("Pool de hash cheio")
+    try:
+        future = _get_executor().submit(func, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=HASH_TIMEOUT_SECONDS)
+    except FutureTimeoutError as exc:
+        incr("auth.hash_timeout")
+        raise HashingBusy("Tempo esgotado aguardando o pool de hash") from exc
+
+
+def _hash(password: str) -> str:
+    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
+    return hashed.decode("utf-8")
+
+
+def _check(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+    except Exception:
+        return False
+
+
+def hash_password(password: str) -> str:
+    """Gera hash bcrypt da senha no pool. Levanta HashingBusy se saturado."""
+    return _run(_hash, password)
+
+
+def hash_password_inline(password: str) -> str:
+    """Gera hash bcrypt na thread atual, sem o pool (tarefas unicas como o init_db)."""
+    return _hash(password)
+
+
+def check_password(password: str, hashed: str) -> bool:
+    """Confere senha contra hash bcrypt no pool. Levanta HashingBusy se saturado."""
+    return _run(_check, password, hashed)
@@ -0,0 +1,272 @@
+"""Fila de ingestao em segundo plano para uploads de contexto.
+
+Os arquivos sao copiados (em memoria ate INGEST_SPOOL_MAX_BYTES, acima disso
+num arquivo temporario), registrados na tabela ingestion_jobs e processados
+por um pool de threads, fora da execucao do script Streamlit. A UI apenas
+enfileira e consulta o status dos jobs.
+
+Cada job guarda o processo dono (boot id, pid e um token do processo). Ao
+subir, o processo so marca como erro os jobs ativos cujo dono morreu nesta
+maquina ou que estao parados ha mais de INGEST_STALE_SECONDS; jobs de outros
+processos vivos continuam intactos.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+from database import connection
+from services.document_service import (
+    process_uploaded_csv,
+    process_uploaded_file,
+    process_uploaded_json,
+)
+from utils.debug import log
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_SPOOL_MAX_BYTES = int(os.getenv("INGEST_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+INGEST_STALE_SECONDS = float(os.getenv("INGEST_STALE_SECONDS", "3600"))
+PROGRESS_MIN_INTERVAL_SECONDS = 0.5
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_ERROR = "error"
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+_PROCESSORS = {
+    ".pdf": process_uploaded_file,
+    ".csv": process_uploaded_csv,
+    ".json": process_uploaded_json,
+}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _boot_id() -> str:
+    try:
+        return Path("/proc/sys/kernel/random/boot_id").read_text().strip()
+    except OSError:
+        return ""
+
+
+_BOOT_ID = _boot_id()
+# o token distingue este processo de um anterior com o mesmo pid (ex.: container reiniciado)
+_OWNER = f"{_BOOT_ID}:{os.getpid()}:{uuid.uuid4().hex}"
+
+
+class _SpooledUpload(tempfile.SpooledTemporaryFile):
+    """Copia do upload com o nome e tamanho originais, como o UploadedFile."""
+
+    def __init__(self, name: str):
+        super().__init__(max_size=max(0, INGEST_SPOOL_MAX_BYTES))
+        self._upload_name = name
+        self.size = 0
+
+    @property
+    def name(self) -> str:
+        return self._upload_name
+
+
+def _execute(sql: str, params: tuple = ()) -> None:
+    conn = connection.get_connection()
+    if conn is None:
+        return
+    try:
+        conn.execute(sql, params)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _update_job(job_id: str, **fields: Any) -> None:
+    assignments = ", ".join(f"{column} = ?" for column in fields)
+    _execute(
+        f"UPDATE ingestion_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        (*fields.values(), job_id),
+    )
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _is_orphan(owner: Optional[str], idle_seconds: float) -> bool:
+    """O dono do job morreu (nesta maquina) ou o job esta parado ha muito tempo."""
+    if idle_seconds >= INGEST_STALE_SECONDS:
+        return True
+    boot_id, _, rest = (owner or "").partition(":")
+    pid, _, _ = rest.partition(":")
+    if not _BOOT_ID or boot_id != _BOOT_ID or not pid.isdigit():
+        # dono em outra maquina/boot ou job antigo sem dono: so pelo timeout
+        return False
+    if int(pid) == os.getpid():
+        # mesmo pid com outro token: processo anterior (ex.: container reiniciado)
+        return owner != _OWNER
+    return not _pid_alive(int(pid))
+
+
+def _recover_interrupted_jobs() -> None:
+    """Jobs ativos cujo processo dono morreu nunca vao terminar: marca como erro."""
+    conn = connection.get_connection()
+    if conn is None:
+        return
+    placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+    try:
+        rows = conn.execute(
+            f"""
+            SELECT id, owner, (julianday('now') - julianday(updated_at)) * 86400.0
+            FROM ingestion_jobs
+            WHERE status IN ({placeholders})
+            """,
+            ACTIVE_STATUSES,
+        ).fetchall()
+        orphans = [row[0] for row in rows if _is_orphan(row[1], row[2] or 0.0)]
+        for job_id in orphans:
+            conn.execute(
+                f"""
+                UPDATE ingestion_jobs
+                SET status = ?, error = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status IN ({placeholders})
+                """,
+                (STATUS_ERROR, "Processamento interrompido (servidor reiniciado).", job_id, *ACTIVE_STATUSES),
+            )
+        conn.commit()
+        if orphans:
+            log(f"ingestion: recovered {len(orphans)} interrupted job(s)")
+    finally:
+        conn.close()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from database.init_db import init_db
+
+            init_db()
+            _recover_interrupted_jobs()
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, INGEST_WORKERS),
+                thread_name_prefix="ingestion",
+            )
+        return _executor
+
+
+def _progress_writer(job_id: str):
+    last_write = 0.0
+
+    def _on_progress(fraction: float, message: str) -> None:
+        nonlocal last_write
+        now = time.monotonic()
+        if fraction < 1.0 and now - last_write < PROGRESS_MIN_INTERVAL_SECONDS:
+            return
+        last_write = now
+        _update_job(job_id, progress=fraction, message=message)
+
+    return _on_progress
+
+
+def _run_job(
+    job_id: str, payload: _SpooledUpload, collection_name: str, user_id: int | None
+) -> None:
+    processor = _PROCESSORS.get(Path(payload.name).suffix.lower())
+    try:
+        _update_job(job_id, status=STATUS_RUNNING)
+        if processor is None:
+            result = {"status": "error", "message": "Tipo de arquivo não suportado."}
+        else:
+            result = processor(
+                payload,
+                collection_name=collection_name,
+                on_progress=_progress_writer(job_id),
+                owner=user_id,
+            )
+
+        if result.get("status") == "success":
+            _update_job(
+                job_id,
+                status=STATUS_DONE,
+                progress=1.0,
+                message=result.get("details") or result.get("message"),
+            )
+        else:
+            _update_job(job_id, status=STATUS_ERROR, error=result.get("message"))
+    except Exception as exc:
+        log(f"ingestion: job {job_id} failed: {exc}")
+        _update_job(job_id, status=STATUS_ERROR, error=str(exc))
+    finally:
+        payload.close()
+
+
+def enqueue_ingestion(uploaded_file, collection_name: str, user_id: int | None = None) -> str:
+    """Copia o upload, registra o job e agenda o processamento. Retorna o id do job."""
+    executor = _get_executor()
+    payload = _SpooledUpload(uploaded_file.name)
+    uploaded_file.seek(0)
+    shutil.copyfileobj(uploaded_file, payload)
+    payload.size = payload.tell()
+    payload.seek(0)
+
+    job_id = uuid.uuid4().hex
+    _execute(
+        """
+        INSERT INTO ingestion_jobs (id, user_id, filename, collection_name, status, owner)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (job_id, user_id, uploaded_file.name, collection_name, STATUS_QUEUED, _OWNER),
+    )
+    executor.submit(_run_job, job_id, payload, collection_name, user_id)
+    log(f"ingestion: queued job {job_id} for '{uploaded_file.name}' -> '{collection_name}'")
+    return job_id
+
+
+def list_jobs(user_id: int | None, limit: int = 10) -> list[dict[str, Any]]:
+    """Retorna os jobs mais recentes do usuario; sem usuario, nenhum."""
+    if user_id is None:
+        # nunca lista jobs de todos: nomes de arquivos e erros sao do dono
+        return []
+    conn = connection.get_connection()
+    if conn is None:
+        return []
+    try:
+        return [
+            dict(row)
+            for row in conn.execute(
+                """
+                SELECT id, filename, collection_name, status, progress, message, error,
+                       created_at, updated_at
+                FROM ingestion_jobs
+                WHERE user_id = ?
+                ORDER BY created_at DESC, rowid DESC
+                LIMIT ?
+                """,
+                (user_id, limit),
+            ).fetchall()
+        ]
+    except Exception as exc:
+        log(f"ingestion: list_jobs error: {exc}")
+        return []
+    finally:
+        conn.close()
+
+
+def has_active_jobs(jobs: list[dict[str, Any]]) -> bool:
+    return any(job.get("status") in ACTIVE_STATUSES for job in jobs)
@@ -1,9 +1,22 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 
+from services.context_builder import build_context, estimate_tokens
+from services.rerank_service import RERANK_CANDIDATES, get_reranker
+from services.response_cache import build_scope, get_response_cache, query_key_tokens
+from services.usage_service import record_usage
+from utils.debug import log
+
+LLM_MODEL_NAME = "gemini-2.5-flash"
+# candidatos levados ao montador de contexto, que corta pelo orcamento de tokens
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "12"))
+
 DEFAULT_SYSTEM_INSTRUCTION = (
     "Voce e o assistente virtual corporativo 'Alea-Lumen'. "
     "Responda de forma profissional e direta."
@@ -42,59 +55,227 @@ def _get_llm_client(api_key: str):
     from langchain_google_genai import ChatGoogleGenerativeAI
 
     return ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
+        model=LLM_MODEL_NAME,
         temperature=0.2,
         google_api_key=api_key,
         max_retries=2,
     )
 
 
-def _build_context_from_docs(docs) -> tuple[str, str]:
-    if not docs:
-        return "Nenhum documento especifico encontrado no banco de dados.", ""
+def _collection_list(collection_name) -> list[str]:
+    """Aceita um nome de colecao ou uma lista deles; remove vazios e repetidos."""
+    names = [collection_name] if isinstance(collection_name, str) else list(collection_name or [])
+    return list(dict.fromkeys(name for name in names if name)) or ["corporate_docs"]
+
+
+def _lookup_cached_response(query: str, system_instruction: str, collection_names: list[str]):
+    """Retorna (resposta_em_cache, chave) — a chave permite gravar apos um miss."""
+    cache = get_response_cache()
+    if cache is None:
+        return None, None
+    try:
+        from database.vector_store import (
+            DEFAULT_EMBEDDING_MODEL,
+            get_collection_version,
+            get_embedding_model,
+        )
+
+        versions = [f"{name}@{get_collection_version(name)}" for name in collection_names]
+        scope = build_scope(
+            LLM_MODEL_NAME,
+            DEFAULT_EMBEDDING_MODEL,
+            system_instruction,
+            query_key_tokens(query),
+            *versions,
+        )
+        embedding = get_embedding_model().embed_query(query)
+        return cache.lookup(scope, embedding), (scope, embedding)
+    except Exception as exc:
+        log(f"llm_service: response cache lookup error: {exc}")
+        return None, None
+
+
+def _store_cached_response(cache_key, query: str, response: str) -> None:
+    cache = get_response_cache()
+    if cache is None or cache_key is None:
+        return
+    try:
+        scope, embedding = cache_key
+        cache.store(scope, query, embedding, response)
+    except Exception as exc:
+        log(f"llm_service: response cache store error: {exc}")
+
+
+async def _timed(timings: dict, stage: str, func, *args, **kwargs):
+    """Executa func (bloqueante) numa thread e registra a duracao da etapa em ms."""
+    start = time.perf_counter()
+    try:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    finally:
+        timings[stage] = (time.perf_counter() - start) * 1000
+
+
+async def _aretrieve(query: str, collection_names: list[str], k: int, timings: dict) -> list:
+    """
+    Busca federada: as colecoes sao consultadas em paralelo e fundidas por RRF.
+    Com o reranker ativo, busca RERANK_CANDIDATES candidatos e mantem os k melhores.
+    """
+    from database.vector_store import search_context
+
+    reranker = get_reranker()
+    fetch_k = max(k, RERANK_CANDIDATES) if reranker is not None else k
+    docs = await _timed(
+        timings, "retrieval", search_context, query, k=fetch_k, collection_name=collection_names
+    )
+    if reranker is None:
+        return docs
+    return await _timed(timings, "rerank", reranker.rerank, query, docs, k)
+
+
+async def _aprepare(query: str, instruction: str, collection_names: list[str], api_key: str):
+    """
+    Etapas anteriores a geracao, com sobreposicao: enquanto o cache semantico
+    e a busca vetorial rodam, o cliente do Gemini e o prompt sao preparados.
+    Retorna (resposta_em_cache, chave_cache, docs, chain, tempos_por_etapa).
+    """
+    timings: dict[str, float] = {}
+
+    async def _lookup_then_retrieve():
+        cached, cache_key = await _timed(
+            timings, "cache_lookup", _lookup_cached_response, query, instruction, collection_names
+        )
+        if cached is not None:
+            return cached, cache_key, []
+        docs = await _aretrieve(query, collection_names, RETRIEVAL_TOP_K, timings)
+        return None, cache_key, docs
+
+    async def _build_chain():
+        # sem o parser de texto: os chunks trazem usage_metadata (tokens do Gemini)
+        llm = await _timed(timings, "llm_warmup", _get_llm_client, api_key)
+        return _get_prompt_template() | llm
+
+    (cached, cache_key, docs), chain = await asyncio.gather(_lookup_then_retrieve(), _build_chain())
+    return cached, cache_key, docs, chain, timings
+
+
+def _run_coroutine(coro):
+    """Roda a corrotina a partir de codigo sincrono (script do Streamlit)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # ja existe um loop nesta thread: executa num loop proprio em outra thread
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
 
-    context_text = "\n\n".join(doc.page_content for doc in docs)
-    sources = sorted({(doc.metadata or {}).get("source", "Desconhecido") for doc in docs})
-    source_note = f"\n\n(Fontes utilizadas: {', '.join(sources)})" if sources else ""
-    return context_text, source_note
+def _log_timings(timings: dict) -> None:
+    log("llm_service: " + ", ".join(f"{stage}={ms:.1f}ms" for stage, ms in timings.items()))
 
 
-def get_ai_response(user_query, system_instruction=None, collection_name: str = "corporate_docs"):
+def stream_ai_response(
+    user_query,
+    system_instruction=None,
+    collection_name="corporate_docs",
+    user=None,
+    agent_id=None,
+):
     """
-    Orquestra o fluxo de RAG:
-    1. Busca Contexto no banco vetorial
+    Orquestra o fluxo de RAG gerando a resposta em pedacos, a medida que o
+    Gemini produz os tokens:
+    0. Reaproveita resposta de pergunta semelhante (cache semantico)
+    1. Busca Contexto no banco vetorial (em paralelo por colecao), enquanto
+       o cliente do Gemini e preparado
     2. Monta o Prompt com os documentos encontrados
-    3. Envia para o Gemini gerar a resposta
+    3. Transmite a resposta do Gemini e, ao final, a nota de fontes
+
+    collection_name aceita um nome ou uma lista de colecoes. user (dict da
+    sessao, com id/usuario/setor) e agent_id sao usados so no registro de uso.
     """
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
-        return "Erro: GOOGLE_API_KEY nao configurada no arquivo .env"
+        yield "Erro: GOOGLE_API_KEY nao configurada no arquivo .env"
+        return
 
     normalized_query = (user_query or "").strip()
     if not normalized_query:
-        return "Informe uma pergunta para o assistente."
+        yield "Informe uma pergunta para o assistente."
+        return
 
+    instruction = system_instruction or DEFAULT_SYSTEM_INSTRUCTION
+    collection_names = _collection_list(collection_name)
+    parser = _get_output_parser()
+    started = time.perf_counter()
+    timings: dict[str, float] = {}
+    cached = None
+    aggregate = None
+    parts: list[str] = []
+    estimated_prompt_tokens = 0
+    status = "ok"
     try:
-        from database.vector_store import search_context
-
-        docs = search_context(normalized_query, k=4, collection_name=collection_name)
-        context_text, source_note = _build_context_from_docs(docs)
-
-        llm = _get_llm_client(api_key)
-        prompt = _get_prompt_template()
-        parser = _get_output_parser()
-        chain = prompt | llm | parser
+        cached, cache_key, docs, chain, timings = _run_coroutine(
+            _aprepare(normalized_query, instruction, collection_names, api_key)
+        )
+        if cached is not None:
+            yield cached
+            return
 
-        response = chain.invoke(
+        context_text, source_note, context_tokens = build_context(docs)
+        estimated_prompt_tokens = context_tokens + estimate_tokens(
+            PROMPT_TEMPLATE + instruction + normalized_query
+        )
+        for chunk in chain.stream(
             {
-                "system_instruction": (system_instruction or DEFAULT_SYSTEM_INSTRUCTION),
+                "system_instruction": instruction,
                 "context": context_text,
                 "query": normalized_query,
             }
-        )
-        return response + source_note
+        ):
+            aggregate = chunk if aggregate is None else aggregate + chunk
+            piece = parser.invoke(chunk)
+            if not piece:
+                continue
+            if not parts:
+                timings["first_token"] = (time.perf_counter() - started) * 1000
+            parts.append(piece)
+            yield piece
+        if source_note:
+            yield source_note
+        _store_cached_response(cache_key, normalized_query, "".join(parts) + source_note)
     except Exception as exc:
-        return f"Erro ao gerar resposta: {str(exc)}"
+        status = "error"
+        yield f"Erro ao gerar resposta: {str(exc)}"
+    finally:
+        timings["total"] = (time.perf_counter() - started) * 1000
+        _log_timings(timings)
+        # contagem do Gemini; estimativa local se a resposta nao trouxer metadados
+        usage = getattr(aggregate, "usage_metadata", None) or {}
+        record_usage(
+            user=user,
+            agent_id=agent_id,
+            collection_names=collection_names,
+            model=LLM_MODEL_NAME,
+            prompt_tokens=usage.get("input_tokens") or estimated_prompt_tokens,
+            completion_tokens=usage.get("output_tokens") or estimate_tokens("".join(parts)),
+            latency_ms=timings["total"],
+            cached=cached is not None,
+            status=status,
+        )
+
+
+def get_ai_response(
+    user_query,
+    system_instruction=None,
+    collection_name="corporate_docs",
+    user=None,
+    agent_id=None,
+):
+    """
+    Versao bloqueante de stream_ai_response: retorna a resposta completa.
+    """
+    return "".join(
+        stream_ai_response(user_query, system_instruction, collection_name, user, agent_id)
+    )
 
 
 def log_interaction(user_id=None, context=None, response=None, attachments=None):
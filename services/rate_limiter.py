@@ -0,0 +1,76 @@
+"""Limitador token bucket em memoria, por chave (email, IP, ...).
+
+Cada chave tem um balde de `capacity` fichas que se recarrega a
+`refill_per_second`; cada tentativa consome uma ficha. As chaves ficam num
+LRUCache, entao uma enxurrada de emails/IPs distintos nao cresce a memoria
+sem limite (chaves esquecidas voltam com o balde cheio).
+
+Sem chave (IP indisponivel: cliente local, proxy sem TRUSTED_PROXY_HOPS) as
+tentativas nao tem como ser separadas por origem; elas dividem um balde
+global RATE_LIMIT_UNKNOWN_MULTIPLIER vezes maior, que so segura abuso em
+massa sem que um unico visitante bloqueie todos os outros.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+from cachetools import LRUCache
+
+from utils.debug import incr
+
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "50000"))
+RATE_LIMIT_UNKNOWN_MULTIPLIER = float(os.getenv("RATE_LIMIT_UNKNOWN_MULTIPLIER", "50"))
+UNKNOWN_KEY = "unknown"
+
+
+class TokenBucketLimiter:
+    def __init__(self, name: str, capacity: float, refill_per_second: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.name = name
+        self.capacity = max(1.0, float(capacity))
+        self.refill_per_second = max(0.0, float(refill_per_second))
+        self._buckets: LRUCache = LRUCache(maxsize=max(1, int(max_keys)))
+        self._lock = threading.Lock()
+        multiplier = max(1.0, RATE_LIMIT_UNKNOWN_MULTIPLIER)
+        # balde compartilhado das tentativas sem chave, fora do LRU
+        self._unknown_capacity = self.capacity * multiplier
+        self._unknown_refill = self.refill_per_second * multiplier
+        self._unknown_bucket: tuple[float, float] | None = None
+
+    def allow(self, key: str | None) -> bool:
+        """Consome uma ficha da chave; False se o balde estiver vazio."""
+        now = time.monotonic()
+        with self._lock:
+            if key:
+                capacity, refill = self.capacity, self.refill_per_second
+                tokens, updated_at = self._buckets.get(key, (capacity, now))
+            else:
+                capacity, refill = self._unknown_capacity, self._unknown_refill
+                tokens, updated_at = self._unknown_bucket or (capacity, now)
+            tokens = min(capacity, tokens + (now - updated_at) * refill)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            if key:
+                self._buckets[key] = (tokens, now)
+            else:
+                self._unknown_bucket = (tokens, now)
+        if not allowed:
+            incr(f"rate_limit.{self.name}{'' if key else '.' + UNKNOWN_KEY}")
+        return allowed
+
+    def reset(self, key: str | None) -> None:
+        with self._lock:
+            if key:
+                self._buckets.pop(key, None)
+            else:
+                self._unknown_bucket = None
+
+
+def per_minute(name: str, env_prefix: str, burst: int, per_minute_rate: float) -> TokenBucketLimiter:
+    """Limitador configuravel por <env_prefix>_BURST e <env_prefix>_PER_MINUTE."""
+    capacity = int(os.getenv(f"{env_prefix}_BURST", str(burst)))
+    rate = float(os.getenv(f"{env_prefix}_PER_MINUTE", str(per_minute_rate)))
+    return TokenBucketLimiter(name, capacity, rate / 60.0)
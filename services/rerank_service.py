@@ -0,0 +1,149 @@
+"""Reordenacao opcional dos candidatos da busca com um cross-encoder local.
+
+A busca traz RERANK_CANDIDATES candidatos; o cross-encoder (CPU, em lotes)
+pontua cada par (pergunta, chunk) e so os k melhores seguem para o prompt.
+A pontuacao roda numa thread propria e a chamada espera no maximo o
+orcamento de latencia: se ele estourar, ou o modelo ainda estiver carregando,
+a ordem original da busca e mantida. Notas ficam em cache por (pergunta, chunk).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from typing import Optional, Sequence
+
+from cachetools import LRUCache
+
+from utils.debug import incr, log
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "0").strip().lower() in {"1", "true", "yes", "on"}
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "30"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "300"))
+RERANK_CACHE_MAX_ENTRIES = int(os.getenv("RERANK_CACHE_MAX_ENTRIES", "10000"))
+
+
+class CrossEncoderReranker:
+    """Cross-encoder com carga em segundo plano, orcamento por chamada e cache de notas."""
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int,
+        budget_ms: float,
+        cache_max_entries: int,
+    ):
+        self.model_name = model_name
+        self.batch_size = max(1, int(batch_size))
+        self.budget_seconds = max(0.0, float(budget_ms)) / 1000
+        self._scores: LRUCache = LRUCache(maxsize=max(1, int(cache_max_entries)))
+        self._cache_lock = threading.Lock()
+        # uma thread so: o cross-encoder ja usa todos os nucleos em cada lote
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self._load_lock = threading.Lock()
+        self._model = None
+        self._loading = False
+
+    def _load_model(self) -> None:
+        try:
+            from sentence_transformers import CrossEncoder
+
+            self._model = CrossEncoder(self.model_name, device="cpu")
+            log(f"rerank: loaded '{self.model_name}'")
+        except Exception as exc:
+            log(f"rerank: failed to load '{self.model_name}': {exc}")
+        finally:
+            with self._load_lock:
+                self._loading = False
+
+    def _model_or_start_loading(self):
+        """Retorna o modelo, ou None disparando a carga (que nao entra no orcamento)."""
+        if self._model is not None:
+            return self._model
+        with self._load_lock:
+            if self._model is None and not self._loading:
+                self._loading = True
+                threading.Thread(
+                    target=self._load_model, name="rerank-load", daemon=True
+                ).start()
+        return self._model
+
+    def _score(self, model, query: str, pending: list, deadline: float) -> bool:
+        """Pontua os pendentes em lotes; False se o prazo acabou antes do fim."""
+        for start in range(0, len(pending), self.batch_size):
+            if time.perf_counter() > deadline:
+                return False
+            batch = pending[start:start + self.batch_size]
+            batch_scores = model.predict(
+                [(query, doc.page_content) for doc in batch],
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+            )
+            with self._cache_lock:
+                for doc, score in zip(batch, batch_scores):
+                    self._scores[(query, doc.id)] = float(score)
+        return True
+
+    def rerank(self, query: str, docs: Sequence, k: int) -> list:
+        """
+        Retorna os k documentos de maior nota. Espera a pontuacao no maximo
+        pelo orcamento; se estourar, volta para a ordem original (docs[:k]).
+        Um lote ja iniciado termina em segundo plano e alimenta o cache.
+        """
+        docs = list(docs)
+        if len(docs) <= 1:
+            return docs[:k]
+        model = self._model_or_start_loading()
+        if model is None:
+            incr("rerank.model_not_ready")
+            return docs[:k]
+
+        started = time.perf_counter()
+        deadline = started + self.budget_seconds
+        # o modelo diferencia maiusculas: a chave e exatamente o texto pontuado
+        query = " ".join(query.split())
+
+        with self._cache_lock:
+            cached = {doc.id for doc in docs if (query, doc.id) in self._scores}
+        pending = [doc for doc in docs if doc.id not in cached]
+        incr("rerank.score_cache.hit", len(docs) - len(pending))
+        incr("rerank.score_cache.miss", len(pending))
+
+        if pending:
+            future = self._executor.submit(self._score, model, query, pending, deadline)
+            try:
+                finished = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+            except FutureTimeoutError:
+                finished = False
+            if not finished:
+                incr("rerank.budget_exceeded")
+                log(f"rerank: budget exceeded scoring {len(pending)}/{len(docs)} candidates")
+                return docs[:k]
+
+        with self._cache_lock:
+            scores = {doc.id: self._scores.get((query, doc.id)) for doc in docs}
+        if any(score is None for score in scores.values()):
+            # notas expulsas do LRU entre a pontuacao e a leitura
+            return docs[:k]
+        ranked = sorted(docs, key=lambda doc: scores[doc.id], reverse=True)
+        log(f"rerank: {len(docs)} candidates in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return ranked[:k]
+
+
+@lru_cache(maxsize=1)
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """Instancia unica do reranker; None quando desativado (RERANK_ENABLED=0)."""
+    if not RERANK_ENABLED:
+        return None
+    return CrossEncoderReranker(
+        RERANK_MODEL,
+        batch_size=RERANK_BATCH_SIZE,
+        budget_ms=RERANK_BUDGET_MS,
+        cache_max_entries=RERANK_CACHE_MAX_ENTRIES,
+    )
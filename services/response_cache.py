@@ -0,0 +1,195 @@
+"""Cache semantico de respostas do LLM.
+
+Respostas ficam num SQLite local, agrupadas por escopo (modelo, instrucao do
+agente, colecao e versao do conteudo da colecao). Uma pergunta cujo embedding
+tenha similaridade de cosseno acima do limiar com uma pergunta ja respondida
+no mesmo escopo reaproveita a resposta. Como a versao da colecao muda a cada
+upload, respostas antigas deixam de ser encontradas automaticamente.
+
+Embeddings quase nao distinguem "contrato 123" de "contrato 124": numeros,
+datas e identificadores (siglas, codigos) da pergunta entram no escopo via
+query_key_tokens, entao so perguntas com exatamente os mesmos tokens dessas
+classes podem compartilhar resposta.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from utils.debug import incr, log
+
+# no mesmo diretorio do Chroma (CHROMA_PERSIST_DIR): o reset da base vetorial
+# (vector_store.clear_database) apaga o cache junto
+RESPONSE_CACHE_PATH = Path(
+    os.getenv(
+        "RESPONSE_CACHE_PATH",
+        str(Path(os.getenv("CHROMA_PERSIST_DIR", "chroma_db")) / "response_cache.db"),
+    )
+)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95"))
+
+# tokens com digito (123, 2024-05-01, NF-e123) ou siglas/codigos em maiusculas (PIX, TED)
+_KEY_TOKEN_RE = re.compile(r"[\w./-]*\d[\w./-]*|\b[A-Z][A-Z0-9_-]+\b")
+
+
+def query_key_tokens(query: str) -> str:
+    """Numeros e identificadores da pergunta, em ordem, que precisam coincidir exatamente."""
+    return " ".join(token.strip("./-") for token in _KEY_TOKEN_RE.findall(query or ""))
+
+
+def build_scope(*parts: str) -> str:
+    """Hash estavel das partes que precisam coincidir para reaproveitar respostas."""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _unit(vector: Sequence[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else array
+
+
+class SemanticResponseCache:
+    """Respostas por (escopo, embedding da pergunta), com limite de tamanho e LRU."""
+
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int,
+        ttl_seconds: float,
+        threshold: float,
+    ):
+        self.path = Path(path)
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.threshold = float(threshold)
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None and not self.path.exists():
+            # arquivo apagado pelo reset da base vetorial: recria em vez de gravar no orfao
+            self._conn.close()
+            self._conn = None
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    scope TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_response_cache_scope_created_at
+                ON response_cache(scope, created_at)
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_response_cache_last_used ON response_cache(last_used)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def lookup(self, scope: str, embedding: Sequence[float]) -> Optional[str]:
+        """Retorna a resposta mais similar do escopo, se acima do limiar."""
+        query_vector = _unit(embedding)
+        min_created = time.time() - self.ttl_seconds
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                """
+                SELECT id, embedding, response
+                FROM response_cache
+                WHERE scope = ? AND created_at >= ?
+                """,
+                (scope, min_created),
+            ).fetchall()
+            if not rows:
+                incr("llm.response_cache.miss")
+                return None
+
+            matrix = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+            scores = matrix @ query_vector
+            best = int(np.argmax(scores))
+            if float(scores[best]) < self.threshold:
+                incr("llm.response_cache.miss")
+                return None
+
+            conn.execute(
+                "UPDATE response_cache SET last_used = ? WHERE id = ?",
+                (time.time(), rows[best][0]),
+            )
+            conn.commit()
+        incr("llm.response_cache.hit")
+        log(f"response_cache: hit (similarity {float(scores[best]):.3f})")
+        return rows[best][2]
+
+    def store(self, scope: str, query: str, embedding: Sequence[float], response: str) -> None:
+        """Grava a resposta e remove expiradas e excedentes menos usadas."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                """
+                INSERT INTO response_cache (scope, query, embedding, response, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (scope, query, _unit(embedding).tobytes(), response, now, now),
+            )
+            conn.execute(
+                "DELETE FROM response_cache WHERE created_at < ?",
+                (now - self.ttl_seconds,),
+            )
+            total = conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+            excess = total - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    """
+                    DELETE FROM response_cache WHERE id IN (
+                        SELECT id FROM response_cache ORDER BY last_used LIMIT ?
+                    )
+                    """,
+                    (excess,),
+                )
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
+
+
+@lru_cache(maxsize=1)
+def get_response_cache() -> Optional[SemanticResponseCache]:
+    """Instancia unica do cache; None quando desativado (RESPONSE_CACHE_MAX_ENTRIES=0)."""
+    if RESPONSE_CACHE_MAX_ENTRIES <= 0:
+        return None
+    return SemanticResponseCache(
+        RESPONSE_CACHE_PATH,
+        max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+        threshold=RESPONSE_CACHE_SIMILARITY,
+    )
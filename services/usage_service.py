@@ -0,0 +1,286 @@
+"""Registro de uso do LLM (tokens, latencia, agente, colecao e usuario/setor).
+
+Cada resposta gera uma linha em llm_usage. O caminho do chat apenas coloca o
+registro numa fila em memoria; uma thread de fundo grava em lotes, entao o
+SQLite nunca atrasa a resposta. Se a fila encher, o registro e descartado
+(e contado em usage.dropped) em vez de bloquear o chat.
+
+Na mesma transacao de cada lote os agregados diarios (usage_daily_setor,
+usage_daily_user, usage_daily_agent) sao incrementados, entao relatorios de
+custo consultam poucas linhas por dia em vez de todo o historico.
+
+created_at (e portanto o dia dos agregados) e gravado no horario local do
+servidor, o mesmo de datetime.date.today() usado pelos filtros de data do
+analytics; assim "hoje" no relatorio e o dia local, nao o dia em UTC.
+"""
+
+from __future__ import annotations
+
+import atexit
+import datetime
+import os
+import queue
+import threading
+from typing import Any, Optional, Sequence
+
+from database import connection
+from utils.debug import incr, log
+
+USAGE_QUEUE_MAX = int(os.getenv("USAGE_QUEUE_MAX", "10000"))
+USAGE_BATCH_SIZE = int(os.getenv("USAGE_BATCH_SIZE", "200"))
+USAGE_FLUSH_SECONDS = float(os.getenv("USAGE_FLUSH_SECONDS", "1.0"))
+
+_COLUMNS = (
+    "created_at",
+    "user_id",
+    "usuario",
+    "setor",
+    "agent_id",
+    "collection_name",
+    "model",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "latency_ms",
+    "cached",
+    "status",
+)
+_INSERT_SQL = (
+    f"INSERT INTO llm_usage ({', '.join(_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in _COLUMNS)})"
+)
+_STOP = object()
+
+_METRICS_SET = """
+    requests = requests + excluded.requests,
+    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+    completion_tokens = completion_tokens + excluded.completion_tokens,
+    total_tokens = total_tokens + excluded.total_tokens,
+    latency_ms_sum = latency_ms_sum + excluded.latency_ms_sum
+"""
+_METRICS_COLUMNS = "requests, prompt_tokens, completion_tokens, total_tokens, latency_ms_sum"
+_METRICS_SELECT = """
+    COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), SUM(total_tokens), SUM(latency_ms)
+"""
+_UPSERT_SETOR_SQL = f"""
+    INSERT INTO usage_daily_setor (day, setor, {_METRICS_COLUMNS})
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(day, setor) DO UPDATE SET {_METRICS_SET}
+"""
+_UPSERT_USER_SQL = f"""
+    INSERT INTO usage_daily_user (day, user_id, usuario, setor, {_METRICS_COLUMNS})
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(day, user_id) DO UPDATE SET
+        usuario = excluded.usuario,
+        setor = excluded.setor,
+        {_METRICS_SET}
+"""
+_UPSERT_AGENT_SQL = f"""
+    INSERT INTO usage_daily_agent (day, agent_id, {_METRICS_COLUMNS})
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(day, agent_id) DO UPDATE SET {_METRICS_SET}
+"""
+
+
+def _add_metrics(totals: dict, key: tuple, row: dict[str, Any]) -> None:
+    current = totals.get(key, (0, 0, 0, 0, 0.0))
+    totals[key] = (
+        current[0] + 1,
+        current[1] + row["prompt_tokens"],
+        current[2] + row["completion_tokens"],
+        current[3] + row["total_tokens"],
+        current[4] + row["latency_ms"],
+    )
+
+
+def _apply_rollups(conn, batch: list[tuple]) -> None:
+    """Soma o lote nos agregados diarios (uma linha por dia e chave)."""
+    per_setor: dict = {}
+    per_user: dict = {}
+    per_agent: dict = {}
+    for values in batch:
+        row = dict(zip(_COLUMNS, values))
+        day = row["created_at"][:10]
+        setor = row["setor"] or ""
+        _add_metrics(per_setor, (day, setor), row)
+        if row["user_id"] is not None:
+            # uso anonimo entra nos agregados por setor/agente, nao num usuario ficticio
+            _add_metrics(per_user, (day, row["user_id"], row["usuario"], setor), row)
+        _add_metrics(per_agent, (day, row["agent_id"] or ""), row)
+
+    conn.executemany(_UPSERT_SETOR_SQL, [key + metrics for key, metrics in per_setor.items()])
+    conn.executemany(_UPSERT_USER_SQL, [key + metrics for key, metrics in per_user.items()])
+    conn.executemany(_UPSERT_AGENT_SQL, [key + metrics for key, metrics in per_agent.items()])
+
+
+def rebuild_rollups(conn) -> None:
+    """Recalcula os agregados diarios a partir de llm_usage (compactacao completa)."""
+    conn.execute("DELETE FROM usage_daily_setor")
+    conn.execute("DELETE FROM usage_daily_user")
+    conn.execute("DELETE FROM usage_daily_agent")
+    conn.execute(
+        f"""
+        INSERT INTO usage_daily_setor (day, setor, {_METRICS_COLUMNS})
+        SELECT substr(created_at, 1, 10), COALESCE(setor, ''), {_METRICS_SELECT}
+        FROM llm_usage GROUP BY 1, 2
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO usage_daily_user (day, user_id, usuario, setor, {_METRICS_COLUMNS})
+        SELECT substr(created_at, 1, 10), user_id, MAX(usuario),
+               MAX(COALESCE(setor, '')), {_METRICS_SELECT}
+        FROM llm_usage WHERE user_id IS NOT NULL GROUP BY 1, 2
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO usage_daily_agent (day, agent_id, {_METRICS_COLUMNS})
+        SELECT substr(created_at, 1, 10), COALESCE(agent_id, ''), {_METRICS_SELECT}
+        FROM llm_usage GROUP BY 1, 2
+        """
+    )
+    conn.commit()
+
+
+def _backfill_rollups() -> None:
+    """Gera os agregados de uso gravado antes de eles existirem."""
+    conn = connection.get_connection()
+    if conn is None:
+        return
+    try:
+        has_usage = conn.execute("SELECT 1 FROM llm_usage LIMIT 1").fetchone()
+        has_rollups = conn.execute("SELECT 1 FROM usage_daily_setor LIMIT 1").fetchone()
+        if has_usage and not has_rollups:
+            rebuild_rollups(conn)
+            log("usage: rebuilt daily rollups from llm_usage")
+    finally:
+        conn.close()
+
+
+class UsageWriter:
+    """Fila + thread de fundo que grava registros de uso em lotes."""
+
+    def __init__(self, max_queue: int, batch_size: int, flush_seconds: float):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_seconds = max(0.05, float(flush_seconds))
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="usage-writer", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, row: tuple) -> None:
+        """Enfileira sem bloquear."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            incr("usage.dropped")
+
+    def _run(self) -> None:
+        try:
+            from database.init_db import init_db
+
+            init_db()
+            _backfill_rollups()
+        except Exception as exc:
+            log(f"usage: init_db failed: {exc}")
+
+        while True:
+            item = self._queue.get()
+            stop = item is _STOP
+            batch = [] if stop else [item]
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=self.flush_seconds)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch: list[tuple]) -> None:
+        conn = connection.get_connection()
+        if conn is None:
+            incr("usage.write_error", len(batch))
+            return
+        try:
+            conn.executemany(_INSERT_SQL, batch)
+            _apply_rollups(conn, batch)
+            conn.commit()
+            incr("usage.written", len(batch))
+        except Exception as exc:
+            incr("usage.write_error", len(batch))
+            log(f"usage: failed to write {len(batch)} rows: {exc}")
+        finally:
+            conn.close()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Grava o que estiver na fila e encerra a thread."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+
+_writer = UsageWriter(USAGE_QUEUE_MAX, USAGE_BATCH_SIZE, USAGE_FLUSH_SECONDS)
+atexit.register(_writer.close)
+
+
+def _local_timestamp() -> str:
+    """Horario local do servidor (ver docstring do modulo)."""
+    now = datetime.datetime.now(datetime.timezone.utc).astimezone()
+    return now.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def record_usage(
+    *,
+    user: Optional[dict[str, Any]] = None,
+    agent_id: Optional[str] = None,
+    collection_names: Sequence[str] = (),
+    model: str = "",
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    latency_ms: float = 0.0,
+    cached: bool = False,
+    status: str = "ok",
+) -> None:
+    """Registra o uso de uma resposta do LLM (nao bloqueia)."""
+    user = user or {}
+    prompt_tokens = int(prompt_tokens or 0)
+    completion_tokens = int(completion_tokens or 0)
+    _writer.submit(
+        (
+            _local_timestamp(),
+            user.get("id"),
+            user.get("usuario"),
+            user.get("setor"),
+            agent_id,
+            ",".join(collection_names),
+            model,
+            prompt_tokens,
+            completion_tokens,
+            prompt_tokens + completion_tokens,
+            round(float(latency_ms), 1),
+            1 if cached else 0,
+            status,
+        )
+    )
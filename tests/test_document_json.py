@@ -0,0 +1,64 @@
+"""Leitura em fluxo de JSON: so um primeiro valor invalido cai no fallback de texto."""
+
+import io
+
+import pytest
+
+import database.vector_store as vector_store
+from services.document_service import process_uploaded_json
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    """Troca a gravacao no Chroma por uma lista com os textos dos lotes."""
+    texts = []
+
+    def _add_document_batches(batches, filename, collection_name="corporate_docs", owner=None):
+        # como a real: erro ao consumir os lotes vira False
+        try:
+            for batch_texts, _ in batches:
+                texts.extend(batch_texts)
+        except Exception:
+            return False
+        return True
+
+    monkeypatch.setattr(vector_store, "add_document_batches", _add_document_batches)
+    return texts
+
+
+def _upload(content: str, name: str = "dados.json") -> io.BytesIO:
+    upload = io.BytesIO(content.encode("utf-8"))
+    upload.name = name
+    upload.size = len(upload.getbuffer())
+    return upload
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        '[{"a": 1},',
+        '[{"a": 1}, {"b": 2',
+        '[{"a": 1} {"b": 2}]',
+        '[{"a": 1},, {"b": 2}]',
+        '[{"a": 1}, {"b": 2},]',
+        '{"a": 1}\n{"b": \n{"c": 3}\n',
+    ],
+)
+def test_malformed_json_after_first_value_fails(saved, content):
+    result = process_uploaded_json(_upload(content))
+
+    assert result["status"] == "error"
+    assert result["message"].startswith("Arquivo invalido")
+
+
+def test_valid_json_array_and_json_lines(saved):
+    assert process_uploaded_json(_upload('[{"a": 1}, {"b": 2}]'))["status"] == "success"
+    assert process_uploaded_json(_upload('{"a": 1}\n{"b": 2}\n'))["status"] == "success"
+    assert any('"a":1' in text for text in saved)
+
+
+def test_non_json_falls_back_to_plain_text(saved):
+    result = process_uploaded_json(_upload("relatorio anual\nsem estrutura json"))
+
+    assert result["status"] == "success"
+    assert any("relatorio anual" in text for text in saved)
@@ -0,0 +1,21 @@
+"""Indice lexical: frases comuns demais ficam so com a busca vetorial."""
+
+import database.vector_store as vector_store
+from database.vector_store import LexicalIndex
+
+
+def test_search_skips_phrases_over_the_match_cap(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "LEXICAL_MAX_MATCHES", 2)
+    index = LexicalIndex(tmp_path / "lexical.db")
+    index.ensure("docs", lambda: iter(()))
+    index.add(
+        "docs",
+        ["c1", "c2", "c3"],
+        ["contrato CTR-2024/17 ativo", "contrato CTR-2024/18 encerrado", "contrato CTR-2024/19 ativo"],
+    )
+
+    # "contrato" aparece nos 3 chunks (acima do limite) e nao entra no ranking
+    assert index.search("docs", "status do contrato CTR-2024/18", 10) == ["c2"]
+    assert sorted(index.search("docs", "ativo", 10)) == ["c1", "c3"]
+    assert index.search("docs", "contrato", 10) == []
+    index.close()
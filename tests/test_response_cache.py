@@ -0,0 +1,37 @@
+"""Cache semantico: perguntas quase iguais com numeros/ids diferentes nao colidem."""
+
+from services.response_cache import SemanticResponseCache, build_scope, query_key_tokens
+
+EMBEDDING = [0.1, 0.2, 0.3, 0.4]
+
+
+def _scope(query: str) -> str:
+    return build_scope("modelo", "embeddings", "instrucao", query_key_tokens(query), "docs@1")
+
+
+def _cache(tmp_path) -> SemanticResponseCache:
+    return SemanticResponseCache(tmp_path / "cache.db", max_entries=10, ttl_seconds=60, threshold=0.95)
+
+
+def test_queries_differing_only_by_number_do_not_collide(tmp_path):
+    cache = _cache(tmp_path)
+    cache.store(_scope("status do contrato 123"), "status do contrato 123", EMBEDDING, "contrato 123 ativo")
+
+    # mesmo embedding (similaridade 1.0), outro contrato
+    assert cache.lookup(_scope("status do contrato 124"), EMBEDDING) is None
+    assert cache.lookup(_scope("Status do contrato  123?"), EMBEDDING) == "contrato 123 ativo"
+    cache.close()
+
+
+def test_queries_differing_by_identifier_or_date_do_not_collide(tmp_path):
+    cache = _cache(tmp_path)
+    cache.store(_scope("limite do PIX em 01/02/2024"), "q", EMBEDDING, "resposta")
+
+    assert cache.lookup(_scope("limite do TED em 01/02/2024"), EMBEDDING) is None
+    assert cache.lookup(_scope("limite do PIX em 02/02/2024"), EMBEDDING) is None
+    cache.close()
+
+
+def test_query_key_tokens():
+    assert query_key_tokens("qual o prazo de ferias?") == ""
+    assert query_key_tokens("pagamento via PIX em 01/02/2024.") == "PIX 01/02/2024"
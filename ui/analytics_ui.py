@@ -0,0 +1,136 @@
+"""Analytics UI: usuarios por setor, gasto de tokens por setor e uso por agente."""
+
+from __future__ import annotations
+
+import datetime
+
+import pandas as pd
+import streamlit as st
+
+from database.init_db import init_db
+from services.agent_service import load_agents
+from services.audit_service import (
+    PRECO_POR_1K_TOKENS,
+    gerar_tabela_ranking_custos,
+    requisicoes_por_agente,
+)
+from services.contadores import count_users, get_users_by_sector_ranking
+from ui.theme import apply_theme, init_theme_state
+from utils.debug import time_block
+
+APP_TITLE = "Alea Lumen - Analytics"
+# agregados mudam a cada lote gravado; um minuto de defasagem e aceitavel no painel
+CACHE_TTL_SECONDS = 60
+DEFAULT_RANGE_DAYS = 30
+
+
+def _ensure_db_initialized() -> None:
+    if st.session_state.get("db_initialized"):
+        return
+    with time_block("analytics: init_db"):
+        init_db()
+    st.session_state["db_initialized"] = True
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _load_users_by_sector() -> tuple[int, pd.DataFrame]:
+    ranking = pd.DataFrame(
+        get_users_by_sector_ranking(), columns=["ranking", "setor", "total_usuarios"]
+    )
+    return count_users(), ranking
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _load_cost_ranking(start: datetime.date, end: datetime.date, price: float) -> pd.DataFrame:
+    return gerar_tabela_ranking_custos(
+        data_inicio=start, data_fim=end, preco_por_1k_tokens=price, exibir=False
+    )
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _load_agent_requests(start: datetime.date, end: datetime.date) -> pd.DataFrame:
+    return requisicoes_por_agente(start, end)
+
+
+def _render_users(total_users: int, ranking: pd.DataFrame) -> None:
+    st.subheader("Usuarios por setor")
+    st.metric("Total de usuarios", total_users)
+    if ranking.empty:
+        st.info("Nenhum usuario cadastrado.")
+        return
+    st.bar_chart(ranking, x="setor", y="total_usuarios")
+    st.dataframe(ranking, use_container_width=True, hide_index=True)
+
+
+def _render_costs(costs: pd.DataFrame) -> None:
+    st.subheader("Gasto de tokens por setor")
+    if costs.empty:
+        st.info("Nenhum uso registrado no periodo.")
+        return
+    col_tokens, col_cost = st.columns(2)
+    col_tokens.metric("Tokens no periodo", f"{int(costs['tokens_acumulados'].sum()):,}")
+    col_cost.metric("Custo estimado", f"R$ {costs['custo_financeiro'].sum():,.2f}")
+    st.bar_chart(costs, x="setor", y="tokens_acumulados")
+    st.dataframe(costs, use_container_width=True, hide_index=True)
+
+
+def _render_agents(agent_requests: pd.DataFrame) -> None:
+    st.subheader("Requisicoes por agente")
+    if agent_requests.empty:
+        st.info("Nenhuma requisicao registrada no periodo.")
+        return
+    names = {agent_id: data.get("name", agent_id) for agent_id, data in load_agents().items()}
+    labeled = agent_requests.assign(
+        agente=agent_requests["agent_id"].map(lambda agent_id: names.get(agent_id) or agent_id or "-")
+    )
+    over_time = labeled.pivot_table(
+        index="day", columns="agente", values="requests", aggfunc="sum", fill_value=0
+    )
+    st.line_chart(over_time)
+
+
+def main(set_page_config: bool = True) -> None:
+    _ensure_db_initialized()
+    if set_page_config:
+        st.set_page_config(page_title=APP_TITLE, layout="wide")
+    init_theme_state()
+    apply_theme()
+
+    role = st.session_state.get("role")
+    if role != "ADMIN":
+        st.error("Acesso restrito a administradores.")
+        return
+
+    st.title("Analytics de Uso")
+
+    today = datetime.date.today()
+    col_start, col_end, col_price = st.columns(3)
+    start = col_start.date_input("De", value=today - datetime.timedelta(days=DEFAULT_RANGE_DAYS))
+    end = col_end.date_input("Ate", value=today)
+    price = col_price.number_input(
+        "Preco por 1k tokens (R$)", min_value=0.0, value=PRECO_POR_1K_TOKENS, step=0.5
+    )
+    if start > end:
+        st.warning("A data inicial deve ser anterior a data final.")
+        return
+
+    if st.button("Atualizar dados"):
+        # limpa so os dados desta pagina, nao o cache do app inteiro
+        _load_users_by_sector.clear()
+        _load_cost_ranking.clear()
+        _load_agent_requests.clear()
+
+    with time_block("analytics: load"):
+        total_users, users_by_sector = _load_users_by_sector()
+        costs = _load_cost_ranking(start, end, float(price))
+        agent_requests = _load_agent_requests(start, end)
+
+    _render_users(total_users, users_by_sector)
+    st.divider()
+    _render_costs(costs)
+    st.divider()
+    _render_agents(agent_requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,20 +9,23 @@ Responsabilidades principais:
 
 O HTML/CSS esta centralizado em ui/chat_markup.py.
 """
-from pathlib import Path
-
 import streamlit as st
 
-from services.llm_service import get_ai_response
-from services.agent_service import load_agents
-from services.document_service import (
-    process_uploaded_file,
-    process_uploaded_csv,
-    process_uploaded_json,
+from services.llm_service import stream_ai_response
+from services.agent_service import get_agent_collections, load_agents
+from services.ingestion_service import (
+    STATUS_DONE,
+    STATUS_ERROR,
+    enqueue_ingestion,
+    has_active_jobs,
+    list_jobs,
 )
 from ui.brand import get_logo_path
 from ui.theme import apply_theme, init_theme_state
 
+INGEST_POLL_SECONDS = 2
+INGEST_JOBS_SHOWN = 5
+
 
 def _ensure_embedding_model():
     try:
@@ -35,6 +38,37 @@ def _ensure_embedding_model():
         # fail silently so UI still renders and shows errors where appropriate
         pass
 
+
+def _render_job_list(jobs):
+    for job in jobs:
+        name = job["filename"]
+        if job["status"] == STATUS_DONE:
+            st.success(f"{name}: {job.get('message') or 'Processado com Sucesso!'}")
+        elif job["status"] == STATUS_ERROR:
+            st.error(f"{name}: {job.get('error') or 'Falha no processamento.'}")
+        else:
+            status_text = job.get("message") or "aguardando..."
+            st.progress(float(job.get("progress") or 0.0), text=f"{name}: {status_text}")
+
+
+@st.fragment(run_every=INGEST_POLL_SECONDS)
+def _poll_ingestion_jobs(user_id):
+    jobs = list_jobs(user_id, limit=INGEST_JOBS_SHOWN)
+    _render_job_list(jobs)
+    if not has_active_jobs(jobs):
+        # todos terminaram: uma execucao completa volta para a lista estatica
+        st.rerun()
+
+
+def _render_ingestion_jobs(user_id):
+    """Mostra os jobs recentes; consulta periodicamente so enquanto houver ativos."""
+    jobs = list_jobs(user_id, limit=INGEST_JOBS_SHOWN)
+    if has_active_jobs(jobs):
+        _poll_ingestion_jobs(user_id)
+    else:
+        _render_job_list(jobs)
+
+
 def exibir_chat():
     """Render main chat interface with improved styling and responsiveness."""
     logo_path = get_logo_path()
@@ -52,8 +86,8 @@ def exibir_chat():
         st.caption("💬 Inteligência corporativa com contexto seguro.")
 
     # --- 1. IDENTIFICAÇÃO DO USUÁRIO (CONTEXTO) ---
-    user_session = st.session_state.get("user", {})
-    _ = user_session.get("id", None)
+    user_session = st.session_state.get("user_info") or st.session_state.get("user") or {}
+    user_id = user_session.get("id", None)
 
     # --- 2. SELEÇÃO DO AGENTE ---
     agents = load_agents()
@@ -100,26 +134,13 @@ def exibir_chat():
                 st.warning("Selecione ao menos um arquivo.")
             else:
                 for uploaded in uploaded_files:
-                    suffix = Path(uploaded.name).suffix.lower()
-                    if suffix == ".pdf":
-                        result = process_uploaded_file(
-                            uploaded, collection_name=current_agent["collection_name"]
-                        )
-                    elif suffix == ".csv":
-                        result = process_uploaded_csv(
-                            uploaded, collection_name=current_agent["collection_name"]
-                        )
-                    elif suffix == ".json":
-                        result = process_uploaded_json(
-                            uploaded, collection_name=current_agent["collection_name"]
-                        )
-                    else:
-                        result = {"status": "error", "message": "Tipo de arquivo não suportado."}
-
-                    if result.get("status") == "success":
-                        st.success(f"{uploaded.name}: {result.get('message')}")
-                    else:
-                        st.error(f"{uploaded.name}: {result.get('message')}")
+                    enqueue_ingestion(
+                        uploaded,
+                        collection_name=current_agent["collection_name"],
+                        user_id=user_id,
+                    )
+                st.toast(f"{len(uploaded_files)} arquivo(s) enviados para processamento.")
+        _render_ingestion_jobs(user_id)
 
     # --- 3. HISTÓRICO DE MENSAGENS ---
     if "messages" not in st.session_state:
@@ -142,20 +163,20 @@ def exibir_chat():
         st.chat_message("user").markdown(prompt)
         st.session_state.messages.append({"role": "user", "content": prompt})
 
-        # 4.2. Gera resposta da IA
+        # 4.2. Gera resposta da IA (renderizada conforme os tokens chegam)
         with st.chat_message("assistant"):
-            with st.spinner(f"{current_agent['name']} está analisando..."):
-                
-                # CHAMADA AO LLM SERVICE
-                # Passamos TODOS os dados necessários para o RAG e para o LOG
-                resposta = get_ai_response(
+            resposta = st.write_stream(
+                stream_ai_response(
                     user_query=prompt,
                     system_instruction=current_agent['system_prompt'],
-                    collection_name=current_agent['collection_name'],
+                    collection_name=get_agent_collections(current_agent),
+                    user=user_session,
+                    agent_id=selected_agent_id,
                 )
-                
-                st.markdown(resposta)
-        
+            )
+            if not isinstance(resposta, str):
+                resposta = "".join(str(part) for part in resposta)
+
         # 4.3. Salva resposta no histórico
         st.session_state.messages.append({"role": "assistant", "content": resposta})
 
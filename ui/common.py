@@ -1,19 +1,30 @@
-import json
+import os
 
 import streamlit as st
 
-from services.auth_service import require_auth
+from services.auth_service import check_auth
 from ui.brand import get_logo_path
 
 ROLE_LABEL = {"ADMIN": "Administrador", "NORMAL": "Usuario", "COMPLIANCE": "Compliance"}
 NIVEL_LABEL = {0: "ADMIN", 1: "NORMAL", 2: "COMPLIANCE"}
+# proxies reversos confiaveis na frente do app; cada um acrescenta um IP a direita
+# do X-Forwarded-For. 0 = usar o IP da conexao e ignorar o cabecalho
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
 
 
-def parse(resp: str) -> dict:
+def client_ip() -> str | None:
+    """IP do navegador da sessao, usado para limitar tentativas de login/cadastro."""
     try:
-        return json.loads(resp) if isinstance(resp, str) else {"success": False, "message": "Resposta invalida"}
+        if TRUSTED_PROXY_HOPS > 0:
+            forwarded = st.context.headers.get("X-Forwarded-For")
+            hops = [hop.strip() for hop in (forwarded or "").split(",") if hop.strip()]
+            if hops:
+                # entradas a esquerda vem do cliente e podem ser forjadas; vale a que
+                # o proxy mais externo acrescentou
+                return hops[-min(TRUSTED_PROXY_HOPS, len(hops))]
+        return getattr(st.context, "ip_address", None)
     except Exception:
-        return {"success": False, "message": "JSON invalido", "raw": str(resp)[:500]}
+        return None
 
 
 def logout():
@@ -55,13 +66,13 @@ def require_session() -> bool:
         return False
 
     token = st.session_state["token"]
-    auth = parse(require_auth(token))
-    if not auth.get("success"):
+    auth = check_auth(token)
+    if not auth.success:
         st.warning("Sessao expirada ou invalida. Faca login novamente.")
         st.session_state.clear()
         st.rerun()
 
-    st.session_state["user_info"] = auth.get("user", st.session_state.get("user_info", {}))
+    st.session_state["user_info"] = auth.user or st.session_state.get("user_info", {})
     return True
 
 
@@ -2,14 +2,13 @@
 
 from __future__ import annotations
 
-import json
-
 import streamlit as st
 
 from routes.routes import DEFAULT_ROUTE
 from database.init_db import init_db
-from services.auth_service import login as auth_login, require_auth
+from services.auth_service import check_auth, login as auth_login
 from ui.brand import get_logo_path
+from ui.common import client_ip
 from ui.theme import apply_theme, init_theme_state
 from utils.debug import log, time_block
 from utils.rerun import safe_rerun
@@ -41,16 +40,16 @@ def _is_authenticated() -> bool:
         return False
 
     try:
-        result = json.loads(require_auth(token))
+        result = check_auth(token)
     except Exception:
         st.session_state["authenticated"] = False
         return False
 
-    authenticated = bool(result.get("success"))
+    authenticated = result.success
     st.session_state["authenticated"] = authenticated
     if authenticated:
         st.session_state["logged_in"] = True
-        st.session_state["user_info"] = result.get("user")
+        st.session_state["user_info"] = result.user
     return authenticated
 
 
@@ -222,22 +221,22 @@ def main(set_page_config: bool = True) -> None:
 
             try:
                 with time_block("login: auth_login"):
-                    result = json.loads(auth_login(email, password))
+                    result = auth_login(email, password, client_ip=client_ip())
             except Exception:
                 st.error("Erro interno ao processar login.")
                 return
 
-            if not result.get("success"):
+            if not result.success:
                 log("login: invalid credentials")
-                st.error(result.get("message", "Falha ao realizar login."))
+                st.error(result.message or "Falha ao realizar login.")
                 return
 
-            st.session_state["token"] = result.get("token")
-            st.session_state["user"] = result.get("user")
-            st.session_state["role"] = result.get("role")
+            st.session_state["token"] = result.token
+            st.session_state["user"] = result.user
+            st.session_state["role"] = result.role
             st.session_state["authenticated"] = True
             st.session_state["logged_in"] = True
-            st.session_state["user_info"] = result.get("user")
+            st.session_state["user_info"] = result.user
 
             log("login: success")
             next_page = _get_query_param("next") or DEFAULT_ROUTE
@@ -2,13 +2,12 @@
 
 from __future__ import annotations
 
-import json
-
 import streamlit as st
 
 from database.init_db import init_db
 from services.auth_service import cadastro_publico_usuario
 from ui.brand import get_logo_path
+from ui.common import client_ip
 from ui.theme import apply_theme, init_theme_state
 from utils.debug import time_block
 from utils.rerun import safe_rerun
@@ -31,13 +30,6 @@ def _set_query_param(name: str, value: str) -> None:
         st.experimental_set_query_params(**params)
 
 
-def _parse_response(raw: str) -> dict:
-    try:
-        return json.loads(raw)
-    except Exception:
-        return {"success": False, "message": "Resposta invalida do servico"}
-
-
 def _redirect_to_login() -> None:
     _set_query_param("page", LOGIN_ROUTE)
     _set_query_param("next", "")
@@ -165,20 +157,19 @@ def main(set_page_config: bool = True) -> None:
             elif password != confirm_password:
                 st.warning("As senhas nao conferem.")
             else:
-                result = _parse_response(
-                    cadastro_publico_usuario(
-                        usuario=usuario.strip(),
-                        email=email.strip(),
-                        password=password,
-                        setor=setor.strip(),
-                    )
+                result = cadastro_publico_usuario(
+                    usuario=usuario.strip(),
+                    email=email.strip(),
+                    password=password,
+                    setor=setor.strip(),
+                    client_ip=client_ip(),
                 )
-                if result.get("success"):
-                    st.success(result.get("message", "Conta criada com sucesso."))
+                if result.success:
+                    st.success(result.message or "Conta criada com sucesso.")
                     if st.button("Ir para login", type="secondary"):
                         _redirect_to_login()
                 else:
-                    st.error(result.get("message", "Falha ao criar conta."))
+                    st.error(result.message or "Falha ao criar conta.")
 
         if st.button("Voltar para login", type="secondary"):
             _redirect_to_login()
@@ -2,8 +2,6 @@
 
 from __future__ import annotations
 
-import json
-
 import pandas as pd
 import streamlit as st
 
@@ -29,13 +27,6 @@ def _ensure_db_initialized() -> None:
     st.session_state["db_initialized"] = True
 
 
-def _parse_response(raw: str) -> dict:
-    try:
-        return json.loads(raw)
-    except Exception:
-        return {"success": False, "message": "Resposta invalida do servico"}
-
-
 def _require_admin() -> bool:
     if st.session_state.get("role") != "ADMIN":
         st.error("Acesso restrito a administradores.")
@@ -66,34 +57,31 @@ def _render_registration_form(token: str) -> None:
         st.error("Preencha usuario, email e setor.")
         return
 
-    response = _parse_response(
-        criar_usuario(
-            token=token,
-            usuario=usuario.strip(),
-            email=email.strip(),
-            password=password,
-            nivel=LOW_ACCESS_LEVEL,
-            setor=setor.strip(),
-        )
+    response = criar_usuario(
+        token=token,
+        usuario=usuario.strip(),
+        email=email.strip(),
+        password=password,
+        nivel=LOW_ACCESS_LEVEL,
+        setor=setor.strip(),
     )
-    if response.get("success"):
+    if response.success:
         st.success("Usuario de baixo acesso criado com sucesso.")
     else:
-        st.error(response.get("message", "Nao foi possivel criar o usuario."))
+        st.error(response.message or "Nao foi possivel criar o usuario.")
 
 
 def _load_low_access_users(token: str) -> pd.DataFrame:
-    response = _parse_response(listar_usuarios(token))
-    if not response.get("success"):
-        st.error(response.get("message", "Falha ao listar usuarios."))
+    response = listar_usuarios(token)
+    if not response.success:
+        st.error(response.message or "Falha ao listar usuarios.")
         return pd.DataFrame()
 
-    rows = response.get("data", [])
-    low_access_rows = [row for row in rows if row.get("nivel") == LOW_ACCESS_LEVEL]
-    if not low_access_rows:
+    df = pd.DataFrame.from_records(response.rows, columns=response.columns)
+    df = df[df["nivel"] == LOW_ACCESS_LEVEL].copy()
+    if df.empty:
         return pd.DataFrame()
 
-    df = pd.DataFrame(low_access_rows)
     df["perfil"] = df["nivel"].map(lambda nivel: ROLE_MAP.get(nivel, "NORMAL"))
     cols = ["id", "usuario", "email", "setor", "perfil", "created_at", "updated_at"]
     keep_cols = [col for col in cols if col in df.columns]
@@ -104,12 +92,12 @@ def _render_access_level_editor(token: str) -> None:
     st.subheader("Alterar nivel de acesso")
     st.caption("Somente administradores podem alterar nivel de acesso de usuarios.")
 
-    response = _parse_response(listar_usuarios(token))
-    if not response.get("success"):
-        st.error(response.get("message", "Falha ao listar usuarios."))
+    response = listar_usuarios(token)
+    if not response.success:
+        st.error(response.message or "Falha ao listar usuarios.")
         return
 
-    rows = response.get("data", [])
+    rows = response.records()
     if not rows:
         st.info("Nenhum usuario encontrado para alteracao de nivel.")
         return
@@ -146,12 +134,12 @@ def _render_access_level_editor(token: str) -> None:
     if not submitted:
         return
 
-    result = _parse_response(alterar_nivel_acesso(token, int(target_user_id), int(novo_nivel)))
-    if result.get("success"):
-        st.success(result.get("message", "Nivel de acesso atualizado."))
+    result = alterar_nivel_acesso(token, int(target_user_id), int(novo_nivel))
+    if result.success:
+        st.success(result.message or "Nivel de acesso atualizado.")
         st.rerun()
     else:
-        st.error(result.get("message", "Nao foi possivel atualizar o nivel de acesso."))
+        st.error(result.message or "Nao foi possivel atualizar o nivel de acesso.")
 
 
 def main(set_page_config: bool = True) -> None:
@@ -3,10 +3,14 @@
 from __future__ import annotations
 
 import os
+import threading
 import time
 from contextlib import contextmanager
 from typing import Iterator
 
+_counters: dict[str, int] = {}
+_counters_lock = threading.Lock()
+
 
 def _enabled() -> bool:
     value = os.getenv("Debug_log", "")
@@ -36,3 +40,22 @@ def time_block(label: str) -> Iterator[None]:
     finally:
         elapsed_ms = (time.perf_counter() - start) * 1000
         log(f"{label}: {elapsed_ms:.1f} ms")
+
+
+def incr(name: str, amount: int = 1) -> None:
+    """Increment a named in-process counter (always on, regardless of DEBUG)."""
+    with _counters_lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def counters(prefix: str = "") -> dict[str, int]:
+    """Return a snapshot of the counters whose name starts with prefix."""
+    with _counters_lock:
+        return {name: value for name, value in _counters.items() if name.startswith(prefix)}
+
+
+def reset_counters(prefix: str = "") -> None:
+    """Reset the counters whose name starts with prefix."""
+    with _counters_lock:
+        for name in [name for name in _counters if name.startswith(prefix)]:
+            del _counters[name]